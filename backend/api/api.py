@@ -1,15 +1,51 @@
 from ninja import Router, NinjaAPI, Schema, File
-from ninja.errors import HttpError
+from ninja.decorators import decorate_view
+from ninja.errors import HttpError, Throttled
 from ninja.files import UploadedFile
-from django.http import HttpRequest
-from .models import Employee, PersonalInfo, ContactInfo, EmploymentInfo, Document
-from .auth_utils import create_jwt, decode_jwt, sha256_hex, generate_empid
+from ninja.security import django_auth_is_staff
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
+from .models import (
+    Employee, PersonalInfo, Document, UploadSession, UploadPart,
+    MerkleLeaf, EmployeeImport,
+)
+from . import ledger
+from .db_router import replica_reads
+from .documents import add_content_reference
+from .downloads import blob_response
+from .upload_limits import limit_upload_size
+from .renderers import dumps, get_renderer
+from .throttling import TokenBucketThrottle, retry_after_handler
+from .profiles import (
+    EmailTaken, cache_profile, cached_profile, diff_profile, first_related, forget_profiles,
+    ledger_version, profile_cache_generation, profile_etag, save_profile_changes, serialize_profile,
+    with_profile,
+)
+from .bulk_import import queue_import
+from .invites import invite_matches, make_invite_token, read_invite_token
+from .export import CONTENT_TYPES, ExportUnavailable, export_profiles
+from .auth_utils import (
+    create_jwt, decode_jwt, sha256_hex, token_from_request, forget_token, forget_employee,
+    jwt_auth, jwt_claims_auth,
+)
+from .empids import EmpidExhausted, allocate_empid
+from .passwords import PasswordHasherBusy, get_hasher, hash_password
+from .verify_cache import NO_DOCUMENT, NO_EMPLOYEE, forget_employees, get_verification_cache
+from .blob_store import CHUNK_SIZE, BlobHashMismatch, BlobTooLarge, get_blob_store
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
-import hashlib, time
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.utils import timezone
+import base64
+import datetime
+import json
+import time
+import uuid
 from django.conf import settings
 
-api = NinjaAPI()
+api = NinjaAPI(renderer=get_renderer())
+api.add_exception_handler(Throttled, retry_after_handler(api))
 
 @api.get("/")
 def hello(request):
@@ -25,6 +61,11 @@ class LoginIn(Schema):
     password: str
 
 
+class SetPasswordIn(Schema):
+    token: str
+    password: str
+
+
 class ProfileIn(Schema):
     firstName: str | None = None
     lastName: str | None = None
@@ -36,46 +77,75 @@ class ProfileIn(Schema):
     department: str | None = None
     employeeId: str | None = None
 
+# Response schemas. Operations using them pass exclude_unset=True, so keys a
+# handler leaves out (e.g. "error" on success) stay out of the JSON.
+class ProfileOut(Schema):
+    firstName: str
+    lastName: str
+    dateOfBirth: str  # YYYY-MM-DD or ""
+    mobile: str
+    email: str
+    address: str
+    jobDesignation: str
+    department: str
+    employeeId: str
+    userHash: str
+    documentHash: str | None
+
+
+class ProfileResponse(Schema):
+    ok: bool
+    profile: ProfileOut | None = None
+    error: str | None = None
+
+
+class VerifyResponse(Schema):
+    ok: bool
+    message: str | None = None
+    error: str | None = None
+
+
+class UploadResponse(Schema):
+    ok: bool
+    documentId: int | None = None
+    documentHash: str | None = None
+    error: str | None = None
+
+
 class VerifyIn(Schema):
     employeeId: str
     hash: str
 
 
-def token_from_request(request: HttpRequest):
-    token = request.COOKIES.get("access_token")
-    if token:
-        return token
-    auth = request.headers.get("Authorization") or request.META.get(
-        "HTTP_AUTHORIZATION", ""
-    )
-    if auth.startswith("Bearer "):
-        return auth.split(" ", 1)[1]
-    return None
+class VerifyHashIn(Schema):
+    hash: str
 
 
-def get_profile_for(emp: Employee):
-    p = emp.personal_info.first()
-    c = emp.contact_info.first()
-    e = emp.employment_info.first()
-    doc = emp.documents.order_by("-uploaded_at").first()
-    document_hash = doc.document_hash if doc else None
+class VerifyBatchIn(Schema):
+    items: list[VerifyIn]
 
-    return {
-        "firstName": p.firstname if p else "",
-        "lastName": p.lastname if p else "",
-        "dateOfBirth": p.dob.isoformat() if p and p.dob else "",
-        "mobile": c.mobile if c else "",
-        "email": emp.email,
-        "address": c.address if c else "",
-        "jobDesignation": e.job_designation if e else "",
-        "department": e.department if e else "",
-        "employeeId": emp.empid,
-        "userHash": emp.user_hash,
-        "documentHash": document_hash,
-    }
+
+class UploadSessionIn(Schema):
+    fileName: str
+    contentType: str | None = None
+    sha256: str | None = None
+
+
+class UploadCommitIn(Schema):
+    sha256: str | None = None
 
 
-@api.post("/auth/register/")
+# Throttles run before the payload is parsed: a rejected request does no DB or hashing work.
+LOGIN_THROTTLES = [TokenBucketThrottle("login"), TokenBucketThrottle("login", "account", "email")]
+REGISTER_THROTTLES = [TokenBucketThrottle("register"), TokenBucketThrottle("register", "account", "email")]
+SET_PASSWORD_THROTTLES = [TokenBucketThrottle("register")]
+VERIFY_THROTTLES = [TokenBucketThrottle("verify"), TokenBucketThrottle("verify", "account", "employeeId")]
+VERIFY_LOOKUP_THROTTLES = [TokenBucketThrottle("verify")]
+# Charged per item, so a batch cannot resolve more IDs than separate requests could.
+VERIFY_BATCH_THROTTLES = [TokenBucketThrottle("verify_batch", per_item="items")]
+
+
+@api.post("/auth/register/", throttle=REGISTER_THROTTLES)
 def register(request, payload: RegisterIn):
     email = payload.email.strip().lower()
     password = payload.password
@@ -91,34 +161,64 @@ def register(request, payload: RegisterIn):
     if Employee.objects.filter(email=email).exists():
         return {"ok": False, "error": "Email already registered"}
 
-    password_hash = sha256_hex(password)
-    empid = generate_empid()
-    while Employee.objects.filter(empid=empid).exists():
-        empid = generate_empid()
+    try:
+        password_hash = hash_password(password)
+    except PasswordHasherBusy:
+        raise HttpError(503, "Server busy, please retry")
+    try:
+        empid = allocate_empid()
+    except EmpidExhausted:
+        raise HttpError(503, "No employee IDs available")
     user_hash = sha256_hex(email + str(time.time()))
     emp = Employee.objects.create(
         empid=empid, email=email, password_hash=password_hash, user_hash=user_hash
     )
+    forget_employees(emp.empid)  # drop any cached "no such employee"
 
     return {"ok": True, "message": "Registration successful. Please login."}
 
 
-@api.post("/auth/login/")
+@api.post("/auth/set-password/", throttle=SET_PASSWORD_THROTTLES)
+def set_password(request, payload: SetPasswordIn):
+    invite = read_invite_token(payload.token)
+    emp = Employee.objects.filter(pk=invite[0]).first() if invite else None
+    if emp is None or not invite_matches(emp, invite[1]):
+        return {"ok": False, "error": "Invite is invalid or has expired"}
+    if len(payload.password) < 8:
+        return {"ok": False, "error": "Password must be at least 8 characters"}
+    try:
+        password_hash = hash_password(payload.password)
+    except PasswordHasherBusy:
+        raise HttpError(503, "Server busy, please retry")
+    # Compare-and-set on the old hash, so a token is redeemed at most once.
+    if not Employee.objects.filter(pk=emp.pk, password_hash=emp.password_hash).update(password_hash=password_hash):
+        return {"ok": False, "error": "Invite is invalid or has expired"}
+    return {"ok": True, "message": "Password set. Please login."}
+
+
+@api.post("/auth/login/", throttle=LOGIN_THROTTLES)
 def login(request, payload: LoginIn):
     email = payload.email.strip().lower()
     password = payload.password
     try:
-        emp = Employee.objects.get(email=email)
+        emp = with_profile().get(email=email)
     except Employee.DoesNotExist:
         raise HttpError(401, "Invalid credentials")
 
 
-    if emp.password_hash != sha256_hex(password):
-        raise HttpError(401, "Invalid credentials")
-
+    hasher = get_hasher()
+    try:
+        if not hasher.verify(password, emp.password_hash):
+            raise HttpError(401, "Invalid credentials")
+        if hasher.needs_rehash(emp.password_hash):
+            # Transparently upgrade legacy SHA-256 and outdated KDF settings.
+            new_hash = hasher.encode(password)
+            Employee.objects.filter(pk=emp.pk).update(password_hash=new_hash)
+    except PasswordHasherBusy:
+        raise HttpError(503, "Server busy, please retry")
 
     token = create_jwt(emp.empid)
-    res = {"ok": True, "profile": get_profile_for(emp)}
+    res = {"ok": True, "profile": serialize_profile(emp)}
     
     response = api.create_response(request, res, status=200)
     
@@ -135,147 +235,604 @@ def login(request, payload: LoginIn):
 
 @api.post("/auth/logout/")
 def logout(request):
+    token = token_from_request(request)
+    if token:
+        claims = decode_jwt(token)
+        forget_token(token)
+        if claims:
+            forget_employee(claims.get("empid"))
     response = api.create_response(request, {"ok": True}, status=200)
     response.delete_cookie("access_token", path="/")
     return response
 
 
-@api.get("/me/")
-def me(request):
-    token = token_from_request(request)
-    if not token:
-        raise HttpError(401, "Not authenticated")
-    payload = decode_jwt(token)
-    if not payload:
-        raise HttpError(401, "Invalid token")
-    empid = payload.get("empid")
-    try:
-        emp = Employee.objects.get(empid=empid)
-    except Employee.DoesNotExist:
-        raise HttpError(404, "User not found")
-    return {"ok": True, "profile": get_profile_for(emp)}
+def etag_matches(request, etag: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    return bool(if_none_match) and (if_none_match.strip() == "*" or etag in parse_etags(if_none_match))
 
 
-@api.get("/profile/")
-def profile_get(request):
-    token = token_from_request(request)
-    if not token:
-        raise HttpError(401, "Not authenticated")
-    payload = decode_jwt(token)
-    if not payload:
-        raise HttpError(401, "Invalid token")
-    empid = payload.get("empid")
-    try:
-        emp = Employee.objects.get(empid=empid)
-    except Employee.DoesNotExist:
-        raise HttpError(404, "User not found")
-    return {"ok": True, "profile": get_profile_for(emp)}
+def not_modified(etag: str):
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    return response
 
 
-@api.put("/profile/")
-def profile_update(request, payload: ProfileIn):
-    token = token_from_request(request)
-    if not token:
-        raise HttpError(401, "Not authenticated")
-    payload_jwt = decode_jwt(token)
-    if not payload_jwt:
-        raise HttpError(401, "Invalid token")
-    empid = payload_jwt.get("empid")
-    emp = Employee.objects.get(empid=empid)
-
-    if payload.email:
-        email = payload.email.strip().lower()
+def profile_response(response: HttpResponse, emp: Employee):
+    response["ETag"] = profile_etag(emp.empid, emp.profile_version)
+    return {"ok": True, "profile": serialize_profile(emp)}
+
+
+def load_profile(empid: str):
+    """Return (version, profile) from the profile cache, loading it on a miss."""
+    cached = cached_profile(empid)
+    if cached is None:
+        started = profile_cache_generation()
         try:
-            validate_email(email)
-        except ValidationError:
-            return {"ok": False, "error": "Invalid email format"}
-        if email != emp.email and Employee.objects.filter(email=email).exists():
-            return {"ok": False, "error": "Email already in use"}
-        emp.email = email
-        emp.save()
+            emp = with_profile().annotate(profile_version=ledger_version()).get(empid=empid)
+        except Employee.DoesNotExist:
+            raise HttpError(404, "User not found")
+        cached = (emp.profile_version, serialize_profile(emp))
+        cache_profile(empid, *cached, started)
+    return cached
 
-    personal_info_updates = {
-        'firstname': payload.firstName,
-        'lastname': payload.lastName,
-        'dob': payload.dateOfBirth if payload.dateOfBirth else None,
-    }
-    personal_info_updates = {k: v for k, v in personal_info_updates.items() if v is not None}
-    if personal_info_updates:
-        PersonalInfo.objects.update_or_create(empid=emp, defaults=personal_info_updates)
 
+def cached_profile_response(request, response: HttpResponse, empid: str, version: int, profile: dict):
+    etag = profile_etag(empid, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response["ETag"] = etag
+    return {"ok": True, "profile": profile}
 
-    contact_info_updates = {
-        'mobile': payload.mobile,
-        'address': payload.address,
-        'email': emp.email,
-    }
-    contact_info_updates = {k: v for k, v in contact_info_updates.items() if v is not None}
-    if contact_info_updates:
-        ContactInfo.objects.update_or_create(empid=emp, defaults=contact_info_updates)
-    
 
-    employment_info_updates = {
-        'job_designation': payload.jobDesignation,
-        'department': payload.department,
-    }
-    employment_info_updates = {k: v for k, v in employment_info_updates.items() if v is not None}
-    if employment_info_updates:
-        EmploymentInfo.objects.update_or_create(empid=emp, defaults=employment_info_updates)
+def _profile(request, response: HttpResponse):
+    # Polls are served from the profile cache: no query until a write
+    # forgets the entry or it expires.
+    empid = request.auth.get("empid")
+    return cached_profile_response(request, response, empid, *load_profile(empid))
+
 
-    return {"ok": True, "profile": get_profile_for(emp)}
+@api.get("/me/", auth=jwt_claims_auth, response=ProfileResponse, exclude_unset=True)
+@replica_reads
+def me(request, response: HttpResponse):
+    return _profile(request, response)
 
 
-@api.post("/documents/")
+@api.get("/profile/", auth=jwt_claims_auth, response=ProfileResponse, exclude_unset=True)
+@replica_reads
+def profile_get(request, response: HttpResponse):
+    return _profile(request, response)
+
+
+@api.put("/profile/", auth=jwt_claims_auth, response=ProfileResponse, exclude_unset=True)
+def profile_update(request, payload: ProfileIn, response: HttpResponse):
+    values = payload.dict(exclude_none=True, exclude={"employeeId"})
+    if "email" in values:
+        values["email"] = values["email"].strip().lower()
+        try:
+            validate_email(values["email"])
+        except ValidationError:
+            return {"ok": False, "error": "Invalid email format"}
+    if values.get("dateOfBirth"):
+        try:
+            values["dateOfBirth"] = datetime.date.fromisoformat(values["dateOfBirth"])
+        except ValueError:
+            return {"ok": False, "error": "Invalid date of birth"}
+    else:
+        values.pop("dateOfBirth", None)
+
+    # One read: current profile, plus whether the new email belongs to someone else.
+    employees = with_profile().annotate(profile_version=ledger_version())
+    if "email" in values:
+        employees = employees.annotate(email_taken=Exists(
+            Employee.objects.filter(email=values["email"]).exclude(pk=OuterRef("pk"))
+        ))
+    try:
+        emp = employees.get(empid=request.auth.get("empid"))
+    except Employee.DoesNotExist:
+        raise HttpError(404, "User not found")
+    if getattr(emp, "email_taken", False):
+        return {"ok": False, "error": "Email already in use"}
+
+    # Statements: this read, one per changed table (see save_profile_changes)
+    # and two for the ledger entry: 4 for a one-table edit, 7 when a single
+    # PUT changes the email and every profile table.
+    changes = diff_profile(emp, values)
+    if changes:
+        try:
+            with transaction.atomic():
+                save_profile_changes(emp, changes)
+                entry = ledger.append("profile.updated", emp.empid, {
+                    "fields": sorted(changes),
+                    "digest": ledger.digest({k: str(v) for k, v in changes.items()}),
+                })
+                emp.profile_version = entry.pk
+                transaction.on_commit(lambda: forget_profiles(emp.empid))
+                if "email" in changes:
+                    transaction.on_commit(lambda: forget_employee(emp.empid))
+        except EmailTaken:
+            # Another account claimed the email between our read and write.
+            return {"ok": False, "error": "Email already in use"}
+
+    return profile_response(response, emp)
+
+
+@api.post("/documents/", auth=jwt_auth, response=UploadResponse, exclude_unset=True)
+@decorate_view(limit_upload_size)
 def upload_document(request, file: UploadedFile = File(...)):
-    token = token_from_request(request)
-    if not token:
-        raise HttpError(401, "Not authenticated")
-    payload_jwt = decode_jwt(token)
-    if not payload_jwt:
-        raise HttpError(401, "Invalid token")
-    empid = payload_jwt.get("empid")
-    emp = Employee.objects.get(empid=empid)
+    emp = request.auth
 
     if not file:
         return {"ok": False, "error": "No file uploaded"}
 
-    data = file.read()
-    content_hash = hashlib.sha256(data).hexdigest()
-    document_name = file.name
+    content_hash, size = store_uploaded_file(file)
     document_type = file.content_type or "application/octet-stream"
+    doc = record_document(emp, file.name, document_type, content_hash, size)
+
+    return {"ok": True, "documentId": doc.pk, "documentHash": doc.document_hash}
+
+
+def store_uploaded_file(file: UploadedFile):
+    # limit_upload_size already stopped oversized bodies while they streamed;
+    # this guards callers that skip it.
+    max_bytes = getattr(settings, "DOCUMENT_MAX_UPLOAD_BYTES", None)
+    if max_bytes is not None and file.size and file.size > max_bytes:
+        raise HttpError(413, "File too large")
+    try:
+        return get_blob_store().save_stream(file.chunks(), max_size=max_bytes)
+    except BlobTooLarge:
+        raise HttpError(413, "File too large")
+
+
+def record_document(emp: Employee, document_name: str, document_type: str, content_hash: str, size: int):
+    with transaction.atomic():
+        # Bytes seen before only bump a reference count.
+        add_content_reference(content_hash, size)
+        doc = Document.objects.create(
+            empid=emp,
+            document_name=document_name,
+            document_type=document_type,
+            document_hash=content_hash,
+            content_id=content_hash,
+        )
+        ledger.append("document.uploaded", emp.empid, {
+            "documentId": doc.pk,
+            "documentName": document_name,
+            "documentHash": content_hash,
+            "size": size,
+        })
+        # The employee's latest hash just changed; verifiers must not see the old one.
+        transaction.on_commit(lambda: forget_employees(emp.empid))
+        transaction.on_commit(lambda: forget_profiles(emp.empid))
+    return doc
+
+
+# Staff (issuers) may fetch any document; employees only their own.
+@api.get("/documents/{int:document_id}/", auth=[django_auth_is_staff, jwt_auth])
+def download_document(request, document_id: int):
+    documents = Document.objects.select_related("content")
+    if isinstance(request.auth, Employee):
+        documents = documents.filter(empid=request.auth)
+    doc = documents.filter(pk=document_id).first()
+    if doc is None:
+        raise HttpError(404, "Document not found")
+    try:
+        return blob_response(
+            request, get_blob_store(), doc.content_id, doc.content.size,
+            doc.document_type, doc.document_name,
+        )
+    except FileNotFoundError:
+        raise HttpError(404, "Document content missing")
+
+
+@api.delete("/documents/{int:document_id}/", auth=jwt_auth)
+def delete_document(request, document_id: int):
+    emp = request.auth
+    with transaction.atomic():
+        doc = Document.objects.filter(pk=document_id, empid=emp).first()
+        if doc is None:
+            raise HttpError(404, "Document not found")
+        doc.delete()  # releases its content reference (api.signals)
+        ledger.append("document.deleted", emp.empid, {
+            "documentId": document_id,
+            "documentHash": doc.document_hash,
+        })
+        transaction.on_commit(lambda: forget_employees(emp.empid))
+        transaction.on_commit(lambda: forget_profiles(emp.empid))
+    return {"ok": True}
+
+
+MAX_UPLOAD_PARTS = 10000
+
+
+def upload_session_cutoff():
+    """Sessions created before this have expired (prune_blobs deletes them)."""
+    return timezone.now() - datetime.timedelta(seconds=getattr(settings, "UPLOAD_SESSION_TTL", 86400))
+
+
+def _upload_session_for(request, upload_id, lock=False) -> UploadSession:
+    sessions = UploadSession.objects.select_for_update() if lock else UploadSession.objects
+    try:
+        return sessions.get(id=upload_id, empid=request.auth, created_at__gte=upload_session_cutoff())
+    except UploadSession.DoesNotExist:
+        raise HttpError(404, "Upload session not found")
 
-    doc = Document.objects.create(
+
+def _staged_bytes(session: UploadSession, except_part: int) -> int:
+    return session.parts.exclude(part_number=except_part).aggregate(total=Sum("size"))["total"] or 0
+
+
+def _upload_parts(session: UploadSession):
+    return [
+        {"partNumber": part.part_number, "size": part.size, "sha256": part.part_hash}
+        for part in session.parts.order_by("part_number")
+    ]
+
+
+@api.post("/documents/uploads/", auth=jwt_auth)
+def create_upload_session(request, payload: UploadSessionIn):
+    emp = request.auth
+    session = UploadSession.objects.create(
         empid=emp,
-        document_name=document_name,
-        document_type=document_type,
-        document_hash=content_hash,
-        content_hash=content_hash,
-        document_data=data,
+        document_name=payload.fileName,
+        document_type=payload.contentType or "application/octet-stream",
+        expected_hash=(payload.sha256 or "").lower(),
     )
+    expires_at = session.created_at + datetime.timedelta(seconds=getattr(settings, "UPLOAD_SESSION_TTL", 86400))
+    return {
+        "ok": True, "uploadId": str(session.id), "maxParts": MAX_UPLOAD_PARTS,
+        "maxBytes": getattr(settings, "DOCUMENT_MAX_UPLOAD_BYTES", None),
+        "expiresAt": expires_at.isoformat(),
+    }
+
 
-    return {"ok": True, "documentHash": doc.document_hash}
+@api.get("/documents/uploads/{upload_id}/", auth=jwt_auth)
+def upload_session_status(request, upload_id: uuid.UUID):
+    session = _upload_session_for(request, upload_id)
+    return {"ok": True, "uploadId": str(session.id), "parts": _upload_parts(session)}
 
-@api.post("/verify/")
+
+@api.put("/documents/uploads/{upload_id}/parts/{part_number}/", auth=jwt_auth)
+def upload_part(request, upload_id: uuid.UUID, part_number: int):
+    session = _upload_session_for(request, upload_id)
+    if not 1 <= part_number <= MAX_UPLOAD_PARTS:
+        raise HttpError(400, f"Part number must be between 1 and {MAX_UPLOAD_PARTS}")
+
+    # DOCUMENT_MAX_UPLOAD_BYTES bounds the whole session, not each part: the
+    # part may only use what the other staged parts have left.
+    max_bytes = getattr(settings, "DOCUMENT_MAX_UPLOAD_BYTES", None)
+    remaining = None if max_bytes is None else max(max_bytes - _staged_bytes(session, part_number), 0)
+    store = get_blob_store()
+    chunks = iter(lambda: request.read(CHUNK_SIZE), b"")
+    claimed = request.headers.get("X-Part-SHA256", "").lower()
+    try:
+        part_hash, size = store.save_part(
+            session.id, part_number, chunks, max_size=remaining, expected_hash=claimed
+        )
+    except BlobTooLarge:
+        raise HttpError(413, "Upload too large")
+    except BlobHashMismatch:
+        raise HttpError(400, "Part hash does not match X-Part-SHA256; retry this part")
+
+    with transaction.atomic():
+        # Parts of one session streamed in parallel each saw the others'
+        # bytes missing, so recheck the total with the session locked.
+        session = _upload_session_for(request, upload_id, lock=True)
+        if max_bytes is not None and _staged_bytes(session, part_number) + size > max_bytes:
+            session.parts.filter(part_number=part_number).delete()
+            store.discard_part(session.id, part_number)
+            raise HttpError(413, "Upload too large")
+        UploadPart.objects.update_or_create(
+            session=session,
+            part_number=part_number,
+            defaults={"size": size, "part_hash": part_hash},
+        )
+    return {"ok": True, "partNumber": part_number, "size": size, "sha256": part_hash}
+
+
+@api.post("/documents/uploads/{upload_id}/commit/", auth=jwt_auth)
+def commit_upload(request, upload_id: uuid.UUID, payload: UploadCommitIn):
+    session = _upload_session_for(request, upload_id)
+    part_numbers = list(session.parts.order_by("part_number").values_list("part_number", flat=True))
+    if not part_numbers:
+        return {"ok": False, "error": "No parts uploaded"}
+    missing = sorted(set(range(1, part_numbers[-1] + 1)) - set(part_numbers))
+    if missing:
+        return {"ok": False, "error": "Missing parts", "missingParts": missing}
+
+    expected = (payload.sha256 or session.expected_hash or "").lower()
+    max_bytes = getattr(settings, "DOCUMENT_MAX_UPLOAD_BYTES", None)
+    store = get_blob_store()
+    try:
+        content_hash, size = store.save_stream(
+            store.iter_parts(session.id, part_numbers), max_size=max_bytes
+        )
+    except BlobTooLarge:
+        raise HttpError(413, "File too large")
+    if expected and expected != content_hash:
+        # The staged parts are kept so the client can re-send the bad ones.
+        return {"ok": False, "error": "Assembled file hash does not match", "sha256": content_hash}
+
+    doc = record_document(session.empid, session.document_name, session.document_type, content_hash, size)
+    store.discard_upload(session.id)
+    session.delete()
+    return {"ok": True, "documentId": doc.pk, "documentHash": doc.document_hash}
+
+
+@api.delete("/documents/uploads/{upload_id}/", auth=jwt_auth)
+def abort_upload(request, upload_id: uuid.UUID):
+    session = _upload_session_for(request, upload_id)
+    get_blob_store().discard_upload(session.id)
+    session.delete()
+    return {"ok": True}
+
+def verification_result(employee_id: str, claimed_hash: str, latest_hash):
+    if latest_hash == NO_EMPLOYEE:
+        return {"ok": False, "error": f"No record found for Employee ID: {employee_id}"}
+    if not latest_hash:
+        return {"ok": False, "error": "No document found for this employee."}
+    # Compare the provided hash with the stored hash
+    if latest_hash == claimed_hash:
+        return {"ok": True, "message": "✅ Document is UNTAMPERED - Hash matches the record."}
+    return {"ok": False, "error": "❌ Document has been TAMPERED - Hash does not match the record."}
+
+
+@api.post("/verify/", response=VerifyResponse, exclude_unset=True, throttle=VERIFY_THROTTLES)
 def verify_document(request, payload: VerifyIn):
     try:
-        # Find the employee by the given ID
-        employee = Employee.objects.get(empid=payload.employeeId)
-        
-        # Get the most recent document for that employee
-        document = employee.documents.order_by("-uploaded_at").first()
-
-        if not document:
-            return {"ok": False, "error": "No document found for this employee."}
-        
-        # Compare the provided hash with the stored hash
-        if document.document_hash == payload.hash:
-            return {"ok": True, "message": "✅ Document is UNTAMPERED - Hash matches the record."}
-        else:
-            return {"ok": False, "error": "❌ Document has been TAMPERED - Hash does not match the record."}
+        # Latest document hash for the employee, from the cache when possible
+        latest_hash = cached_latest_hashes([payload.employeeId])[payload.employeeId.casefold()]
+        return verification_result(payload.employeeId, payload.hash, latest_hash)
 
-    except Employee.DoesNotExist:
-        return {"ok": False, "error": f"No record found for Employee ID: {payload.employeeId}"}
     except Exception as e:
         # Generic error for any other issues
         return {"ok": False, "error": "An unexpected error occurred during verification."}
 
+
+def documents_with_hash(document_hash: str):
+    return Document.objects.filter(document_hash=document_hash).order_by("-uploaded_at")
+
+
+@api.get("/verify/cache/", auth=django_auth_is_staff)
+def verify_cache_stats(request):
+    return {"ok": True, **get_verification_cache().stats()}
+
+
+@api.post("/verify/hash/", throttle=VERIFY_LOOKUP_THROTTLES)
+@replica_reads
+def verify_hash(request, payload: VerifyHashIn):
+    doc = documents_with_hash(payload.hash).values("empid_id", "uploaded_at").first()
+    if not doc:
+        return {"ok": False, "error": "❌ No record holds this hash."}
+    return {
+        "ok": True,
+        "message": "✅ Hash matches a recorded document.",
+        "employeeId": doc["empid_id"],
+        "uploadedAt": doc["uploaded_at"].isoformat(),
+    }
+
+
+@api.get("/verify/proof/{document_hash}/", throttle=VERIFY_LOOKUP_THROTTLES)
+@replica_reads
+def merkle_proof(request, document_hash: str):
+    leaf = (
+        MerkleLeaf.objects.filter(document__document_hash=document_hash)
+        .select_related("batch")
+        .order_by("-document__uploaded_at")
+        .first()
+    )
+    if not leaf:
+        return {"ok": False, "error": "No sealed batch contains this hash yet."}
+    return {
+        "ok": True,
+        "documentHash": document_hash,
+        "batchId": leaf.batch_id,
+        "root": leaf.batch.root,
+        "leafIndex": leaf.leaf_index,
+        "proof": [{"side": side, "hash": sibling} for side, sibling in leaf.proof],
+        "sealedAt": leaf.batch.created_at.isoformat(),
+    }
+
+
+def latest_document_hash_rows(empids):
+    """(empid, newest document hash) for each existing empid, in one query."""
+    return Employee.objects.filter(empid__in=set(empids)).annotate(
+        latest_document_hash=first_related(Document, "document_hash", "-uploaded_at"),
+    ).values_list("empid", "latest_document_hash")
+
+
+def verification_values(empids, rows):
+    """Map every empid (casefolded) to its hash, NO_DOCUMENT or NO_EMPLOYEE."""
+    latest = {empid.casefold(): document_hash for empid, document_hash in rows}
+    return {
+        empid.casefold(): latest.get(empid.casefold(), NO_EMPLOYEE) or NO_DOCUMENT
+        for empid in empids
+    }
+
+
+def load_latest_hashes(empids):
+    """Verification cache loader."""
+    return verification_values(empids, latest_document_hash_rows(empids))
+
+
+def cached_latest_hashes(empids):
+    return get_verification_cache().get_many(empids, load_latest_hashes)
+
+
+def verify_batch_results(items):
+    """Yield one result per item, resolving VERIFY_BATCH_CHUNK_SIZE items per query."""
+    chunk_size = getattr(settings, "VERIFY_BATCH_CHUNK_SIZE", 1000)
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        latest = cached_latest_hashes([item.employeeId for item in chunk])
+        for item in chunk:
+            latest_hash = latest[item.employeeId.casefold()]
+            result = verification_result(item.employeeId, item.hash, latest_hash)
+            yield {"employeeId": item.employeeId, "hash": item.hash, **result}
+
+
+@api.post("/verify/batch/", throttle=VERIFY_BATCH_THROTTLES)
+def verify_batch(request, payload: VerifyBatchIn, format: str = "json"):
+    max_items = getattr(settings, "VERIFY_BATCH_MAX_ITEMS", 10000)
+    if len(payload.items) > max_items:
+        raise HttpError(413, f"At most {max_items} items per batch")
+
+    results = verify_batch_results(payload.items)
+    if format == "ndjson":
+        lines = (dumps(result) + b"\n" for result in results)
+        return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+    results = list(results)
+    matched = sum(1 for result in results if result["ok"])
+    return {"ok": True, "total": len(results), "matched": matched, "results": results}
+
+
+EMPLOYEE_PAGE_LIMIT = 200
+
+
+@api.get("/employees/", auth=django_auth_is_staff)
+@replica_reads
+def list_employees(
+    request,
+    department: str | None = None,
+    designation: str | None = None,
+    name: str | None = None,
+    cursor: str | None = None,
+    limit: int = 50,
+):
+    """Issuer listing: filter by department, designation and name prefix.
+
+    Pages are keyed (pass the previous page's nextCursor), so a deep page
+    costs the same index range scan as the first one. Listings are keyed on
+    empid; a name-only search on (name, empid), see _name_search_page.
+    """
+    limit = max(1, min(limit, EMPLOYEE_PAGE_LIMIT))
+    if name and not (department or designation):
+        empids, next_cursor = _name_search_page(name, cursor, limit)
+        employees = Employee.objects.only("empid", "email", "user_hash").filter(pk__in=empids)
+        profiles = {emp.empid: serialize_profile(emp) for emp in with_profile(employees)}
+        results = [profiles[empid] for empid in empids if empid in profiles]
+        return {"ok": True, "results": results, "nextCursor": next_cursor}
+    # Order (and seek) on the filtered table's empid column so the database
+    # walks one composite index in order instead of sorting the matches.
+    # With a department or designation, a name only filters that walk.
+    key = "employment_info__empid" if department or designation else "empid"
+    # All conditions go into one filter() call so each related table is joined once.
+    conditions, name_match = {}, Q()
+    if department:
+        conditions["employment_info__department"] = department
+    if designation:
+        conditions["employment_info__job_designation"] = designation
+    if name:
+        first, _, last = name.strip().partition(" ")
+        if last:
+            conditions["personal_info__firstname__iexact"] = first
+            conditions["personal_info__lastname__istartswith"] = last.strip()
+        else:
+            name_match = (
+                Q(personal_info__firstname__istartswith=first)
+                | Q(personal_info__lastname__istartswith=first)
+            )
+    if cursor:
+        conditions[f"{key}__gt"] = cursor
+    employees = Employee.objects.only("empid", "email", "user_hash").filter(name_match, **conditions)
+    # Profile tables hold one row per employee, so these joins never fan out.
+    page = [serialize_profile(emp) for emp in with_profile(employees).order_by(key)[:limit + 1]]
+    next_cursor = page[limit - 1]["employeeId"] if len(page) > limit else None
+    return {"ok": True, "results": page[:limit], "nextCursor": next_cursor}
+
+
+def _name_search_page(name: str, cursor: str | None, limit: int):
+    """Return (empids, nextCursor) for one page of a name-only search.
+
+    "First Last" matches the first name exactly and the last name by
+    prefix. A single word matches either name by prefix: last-name matches
+    come first, then first-name matches whose last name did not already
+    match. Each phase is one range on personal_last_emp_idx or
+    personal_first_emp_idx, read in (name, empid) order from the cursor.
+    Under MySQL's _ci collations the prefix LIKE is itself an index range.
+    """
+    first, _, last = name.strip().partition(" ")
+    if last:
+        phases = [("last", Q(firstname__iexact=first, lastname__istartswith=last.strip()))]
+    else:
+        phases = [
+            ("last", Q(lastname__istartswith=first)),
+            ("first", Q(firstname__istartswith=first) & ~Q(lastname__istartswith=first)),
+        ]
+    position = None
+    if cursor:
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            cursor_phase, _, _ = position
+            start = [phase for phase, _ in phases].index(cursor_phase)
+        except (ValueError, TypeError):
+            raise HttpError(400, "Invalid cursor")
+        phases = phases[start:]
+
+    rows = []
+    for phase, condition in phases:
+        field = f"{phase}name"
+        matches = PersonalInfo.objects.filter(condition)
+        if position and position[0] == phase:
+            _, value, empid = position
+            matches = matches.filter(
+                Q(**{f"{field}__gt": value}) | Q(**{field: value, "empid_id__gt": empid})
+            )
+        matches = matches.order_by(field, "empid_id").values_list(field, "empid_id")
+        rows += [(phase, value, empid) for value, empid in matches[:limit + 1 - len(rows)]]
+        if len(rows) > limit:
+            break
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = base64.urlsafe_b64encode(json.dumps(rows[limit - 1]).encode()).decode()
+    return [empid for _, _, empid in rows[:limit]], next_cursor
+
+
+IMPORT_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+@api.post("/employees/import/", auth=django_auth_is_staff)
+def import_employees_file(request, file: UploadedFile = File(...), format: str | None = None):
+    """Queue an import; run_employee_imports does the work (see api.bulk_import)."""
+    fmt = format or next(
+        (fmt for suffix, fmt in IMPORT_FORMATS.items() if file.name.lower().endswith(suffix)), "csv"
+    )
+    if fmt not in ("csv", "ndjson"):
+        raise HttpError(400, "format must be csv or ndjson")
+    job = queue_import(file.chunks(), file.name, fmt)
+    return api.create_response(request, import_status_body(job), status=202)
+
+
+def import_status_body(job: EmployeeImport):
+    return {"ok": True, "importId": str(job.id), "status": job.status, "report": job.report}
+
+
+@api.get("/employees/import/{import_id}/", auth=django_auth_is_staff)
+def import_status(request, import_id: uuid.UUID):
+    job = EmployeeImport.objects.filter(pk=import_id).first()
+    if job is None:
+        raise HttpError(404, "Import not found")
+    return import_status_body(job)
+
+
+@api.post("/employees/{empid}/invite/", auth=django_auth_is_staff)
+def invite_employee(request, empid: str):
+    """Token for /auth/set-password/; hand it to the employee out of band."""
+    emp = Employee.objects.filter(pk=empid).only("empid", "password_hash").first()
+    if emp is None:
+        raise HttpError(404, "Employee not found")
+    return {"ok": True, "employeeId": emp.empid, "token": make_invite_token(emp)}
+
+
+
+@api.get("/employees/export/", auth=django_auth_is_staff)
+def export_employees(request, format: str = "csv"):
+    page_size = getattr(settings, "EMPLOYEE_EXPORT_PAGE_SIZE", 2000)
+    try:
+        chunks = export_profiles(format, page_size=page_size)
+    except ValueError:
+        raise HttpError(400, "format must be csv, ndjson or parquet")
+    except ExportUnavailable as exc:
+        raise HttpError(400, str(exc))
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[format])
+    response["Content-Disposition"] = f'attachment; filename="employees.{format}"'
+    return response
@@ -0,0 +1,87 @@
+# api/async_api.py
+"""Async (ASGI) variants of the hot read and upload endpoints.
+
+Mounted at /api/async/. The handlers mirror the ones in api.py but use the
+async ORM, and push blocking file I/O and transactions onto worker threads.
+Under an ASGI server (see backend/asgi.py), a slow MySQL round trip or a
+large upload then parks a coroutine instead of a whole worker.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from ninja import NinjaAPI, File
+from ninja.decorators import decorate_view
+from ninja.errors import HttpError, Throttled
+from ninja.files import UploadedFile
+
+from .api import (
+    VERIFY_THROTTLES, ProfileResponse, UploadResponse, VerifyIn, VerifyResponse,
+    cached_profile_response, latest_document_hash_rows, record_document, store_uploaded_file,
+    verification_result, verification_values,
+)
+from .auth_utils import async_jwt_auth, async_jwt_claims_auth
+from .db_router import replica_reads
+from .models import Employee
+from .profiles import (
+    cache_profile, cached_profile, ledger_version, profile_cache_generation, serialize_profile,
+    with_profile,
+)
+from .renderers import get_renderer
+from .throttling import retry_after_handler
+from .upload_limits import limit_upload_size
+from .verify_cache import get_verification_cache
+
+async_api = NinjaAPI(urls_namespace="async_api", renderer=get_renderer())
+async_api.add_exception_handler(Throttled, retry_after_handler(async_api))
+
+
+async def _profile_response(request, response: HttpResponse):
+    empid = request.auth.get("empid")
+    cached = cached_profile(empid)
+    if cached is None:
+        started = profile_cache_generation()
+        try:
+            emp = await with_profile().annotate(profile_version=ledger_version()).aget(empid=empid)
+        except Employee.DoesNotExist:
+            raise HttpError(404, "User not found")
+        cached = (emp.profile_version, serialize_profile(emp))
+        cache_profile(empid, *cached, started)
+    return cached_profile_response(request, response, empid, *cached)
+
+
+@async_api.get("/me/", auth=async_jwt_claims_auth, response=ProfileResponse, exclude_unset=True)
+@replica_reads
+async def me(request, response: HttpResponse):
+    return await _profile_response(request, response)
+
+
+@async_api.get("/profile/", auth=async_jwt_claims_auth, response=ProfileResponse, exclude_unset=True)
+@replica_reads
+async def profile_get(request, response: HttpResponse):
+    return await _profile_response(request, response)
+
+
+@async_api.post("/documents/", auth=async_jwt_auth, response=UploadResponse, exclude_unset=True)
+@decorate_view(limit_upload_size)
+async def upload_document(request, file: UploadedFile = File(...)):
+    if not file:
+        return {"ok": False, "error": "No file uploaded"}
+    content_hash, size = await sync_to_async(store_uploaded_file, thread_sensitive=False)(file)
+    document_type = file.content_type or "application/octet-stream"
+    doc = await sync_to_async(record_document)(request.auth, file.name, document_type, content_hash, size)
+    return {"ok": True, "documentId": doc.pk, "documentHash": doc.document_hash}
+
+
+async def aload_latest_hashes(empids):
+    """load_latest_hashes() on the async ORM, so a cache miss needs no thread hop."""
+    rows = [row async for row in latest_document_hash_rows(empids)]
+    return verification_values(empids, rows)
+
+
+@async_api.post("/verify/", response=VerifyResponse, exclude_unset=True, throttle=VERIFY_THROTTLES)
+async def verify_document(request, payload: VerifyIn):
+    try:
+        latest = await get_verification_cache().aget_many([payload.employeeId], aload_latest_hashes)
+        latest_hash = latest[payload.employeeId.casefold()]
+        return verification_result(payload.employeeId, payload.hash, latest_hash)
+    except Exception:
+        return {"ok": False, "error": "An unexpected error occurred during verification."}
@@ -2,14 +2,27 @@
 import jwt
 import datetime
 import time
-import random
+import copy
 import hashlib
 from django.conf import settings
+from django.http import HttpRequest
+from ninja.errors import HttpError
+from ninja.security.base import AuthBase
+from .caching import LRUCache
+from .models import Employee
 
 ALGO = "HS256"
 SECRET = settings.SECRET_KEY
 EXP_SECONDS = getattr(settings, "JWT_EXPIRATION_SECONDS", 24*3600)
 
+# Verified token -> claims, each entry expiring with the token itself.
+_claims_cache = LRUCache(maxsize=getattr(settings, "JWT_DECODE_CACHE_SIZE", 10000))
+# empid -> Employee, kept briefly so jwt_auth endpoints skip the lookup.
+_employee_cache = LRUCache(
+    maxsize=getattr(settings, "JWT_EMPLOYEE_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "JWT_EMPLOYEE_CACHE_TTL", 30),
+)
+
 def create_jwt(empid: str) -> str:
     payload = {
         "empid": empid,
@@ -26,11 +39,106 @@ def decode_jwt(token: str):
     except Exception:
         return None
 
+def decode_jwt_cached(token: str):
+    claims = _claims_cache.get(token)
+    if claims is None:
+        claims = decode_jwt(token)
+        if claims:
+            _claims_cache.set(token, claims, expires_at=claims.get("exp"))
+    return claims
+
+
+def forget_token(token: str):
+    _claims_cache.delete(token)
+
+
+def forget_employee(empid: str):
+    _employee_cache.delete(empid)
+
+
+def clear_auth_caches():
+    _claims_cache.clear()
+    _employee_cache.clear()
+
+
+def token_from_request(request: HttpRequest):
+    token = request.COOKIES.get("access_token")
+    if token:
+        return token
+    auth = request.headers.get("Authorization") or request.META.get(
+        "HTTP_AUTHORIZATION", ""
+    )
+    if auth.startswith("Bearer "):
+        return auth.split(" ", 1)[1]
+    return None
+
+
+class JWTAuth(AuthBase):
+    """Resolve the access_token cookie or Bearer header once per request.
+
+    request.auth is the Employee, or just the verified claims when
+    load_employee is False (for handlers that query by empid themselves).
+    """
+    openapi_type = "http"
+    openapi_scheme = "bearer"
+
+    def __init__(self, load_employee: bool = True):
+        self.load_employee = load_employee
+        super().__init__()
+
+    def __call__(self, request: HttpRequest):
+        token = token_from_request(request)
+        if not token:
+            raise HttpError(401, "Not authenticated")
+        claims = decode_jwt_cached(token)
+        if not claims:
+            raise HttpError(401, "Invalid token")
+        if not self.load_employee:
+            return claims
+        return self.get_employee(claims.get("empid"))
+
+    def get_employee(self, empid: str) -> Employee:
+        emp = _employee_cache.get(empid)
+        if emp is None:
+            try:
+                emp = Employee.objects.get(empid=empid)
+            except Employee.DoesNotExist:
+                raise HttpError(404, "User not found")
+            _employee_cache.set(empid, emp)
+        # Handlers may modify their employee; never hand out the cached instance.
+        return copy.copy(emp)
+
+
+class AsyncJWTAuth(JWTAuth):
+    """JWTAuth for async handlers: the employee lookup uses the async ORM."""
+
+    async def __call__(self, request: HttpRequest):
+        token = token_from_request(request)
+        if not token:
+            raise HttpError(401, "Not authenticated")
+        claims = decode_jwt_cached(token)
+        if not claims:
+            raise HttpError(401, "Invalid token")
+        if not self.load_employee:
+            return claims
+        return await self.aget_employee(claims.get("empid"))
+
+    async def aget_employee(self, empid: str) -> Employee:
+        emp = _employee_cache.get(empid)
+        if emp is None:
+            try:
+                emp = await Employee.objects.aget(empid=empid)
+            except Employee.DoesNotExist:
+                raise HttpError(404, "User not found")
+            _employee_cache.set(empid, emp)
+        return copy.copy(emp)
+
+
+jwt_auth = JWTAuth()
+jwt_claims_auth = JWTAuth(load_employee=False)
+async_jwt_auth = AsyncJWTAuth()
+async_jwt_claims_auth = AsyncJWTAuth(load_employee=False)
+
+
 def sha256_hex(value: str) -> str:
     return hashlib.sha256(value.encode()).hexdigest()
-
-def generate_empid():
-    for _ in range(10):
-        cand = f"emp{random.randint(10000, 9999999)}"[:10]
-        # caller should check uniqueness
-        return cand
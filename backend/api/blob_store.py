@@ -0,0 +1,214 @@
+# api/blob_store.py
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+CHUNK_SIZE = 64 * 1024
+
+
+class BlobTooLarge(Exception):
+    def __init__(self, max_size: int):
+        super().__init__(f"Blob exceeds {max_size} bytes")
+        self.max_size = max_size
+
+
+class BlobHashMismatch(Exception):
+    def __init__(self, expected: str, actual: str):
+        super().__init__(f"Expected SHA-256 {expected}, got {actual}")
+        self.expected = expected
+        self.actual = actual
+
+
+class FileSystemBlobStore:
+    """Content-addressed store: blobs live at <root>/ab/cd/<sha256>."""
+
+    def __init__(self, root=None):
+        self._root = Path(root) if root else None
+
+    @property
+    def root(self) -> Path:
+        return self._root or Path(settings.BASE_DIR) / "blobs"
+
+    def path(self, content_hash: str) -> Path:
+        if not HASH_RE.match(content_hash or ""):
+            raise ValueError(f"Invalid content hash: {content_hash!r}")
+        return self.root / content_hash[:2] / content_hash[2:4] / content_hash
+
+    def exists(self, content_hash: str) -> bool:
+        return self.path(content_hash).exists()
+
+    def size(self, content_hash: str) -> int:
+        return self.path(content_hash).stat().st_size
+
+    def open(self, content_hash: str):
+        return open(self.path(content_hash), "rb")
+
+    def save(self, data: bytes):
+        """Store data and return (content_hash, size)."""
+        return self.save_stream([data])
+
+    def save_stream(self, chunks, max_size=None):
+        """Hash and write chunks in one pass; return (content_hash, size).
+
+        Raises BlobTooLarge as soon as more than max_size bytes arrive.
+        """
+        tmp = self._temp_file(self.root / "tmp")
+        with self._discard_on_error(tmp):
+            content_hash, size = self._write_chunks(tmp, chunks, max_size)
+            target = self.path(content_hash)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            self._commit(tmp, target)
+        return content_hash, size
+
+    def save_part(self, upload_id, part_number: int, chunks, max_size=None, expected_hash=None):
+        """Stage one part of a multi-part upload; return (part_hash, size)."""
+        directory = self._upload_dir(upload_id)
+        tmp = self._temp_file(directory)
+        with self._discard_on_error(tmp):
+            part_hash, size = self._write_chunks(tmp, chunks, max_size)
+            if expected_hash and expected_hash != part_hash:
+                raise BlobHashMismatch(expected_hash, part_hash)
+            # A retried part simply replaces the earlier attempt.
+            tmp.flush()
+            os.fsync(tmp.fileno())
+            tmp.close()
+            os.replace(tmp.name, directory / f"{part_number:06d}")
+        return part_hash, size
+
+    def iter_parts(self, upload_id, part_numbers, chunk_size=CHUNK_SIZE):
+        directory = self._upload_dir(upload_id)
+        for part_number in part_numbers:
+            with open(directory / f"{part_number:06d}", "rb") as fh:
+                yield from iter(lambda: fh.read(chunk_size), b"")
+
+    def discard_part(self, upload_id, part_number: int):
+        try:
+            (self._upload_dir(upload_id) / f"{part_number:06d}").unlink()
+        except FileNotFoundError:
+            pass
+
+    def discard_upload(self, upload_id):
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+
+    def iter_uploads(self):
+        """Yield (upload_id, mtime) for every staged upload directory."""
+        uploads = self.root / "uploads"
+        if not uploads.is_dir():
+            return
+        for path in uploads.iterdir():
+            try:
+                upload_id = uuid.UUID(path.name)
+            except ValueError:
+                continue
+            yield str(upload_id), path.stat().st_mtime
+
+    def prune_uploads(self, active, older_than: float):
+        """Delete staged upload directories not in active(ids) and untouched since older_than.
+
+        active takes a list of upload IDs and returns those with a live session.
+        Returns (deleted count, bytes freed).
+        """
+        deleted = freed = 0
+        candidates = [u for u, mtime in self.iter_uploads() if mtime < older_than]
+        for start in range(0, len(candidates), 1000):
+            batch = candidates[start:start + 1000]
+            keep = {str(u) for u in active(batch)}
+            for upload_id in batch:
+                if upload_id not in keep:
+                    directory = self._upload_dir(upload_id)
+                    freed += sum(p.stat().st_size for p in directory.iterdir() if p.is_file())
+                    self.discard_upload(upload_id)
+                    deleted += 1
+        return deleted, freed
+
+    def delete(self, content_hash: str):
+        try:
+            self.path(content_hash).unlink()
+        except FileNotFoundError:
+            pass
+
+    def iter_blobs(self):
+        """Yield (content_hash, mtime) for every stored blob."""
+        for path in self.root.glob("??/??/*"):
+            if HASH_RE.match(path.name):
+                yield path.name, path.stat().st_mtime
+
+    def prune_unreferenced(self, referenced, older_than: float):
+        """Delete blobs not in referenced(hashes) and untouched since older_than.
+
+        referenced takes a list of hashes and returns the subset still in use.
+        Returns (deleted count, bytes freed).
+        """
+        deleted = freed = 0
+        candidates = [h for h, mtime in self.iter_blobs() if mtime < older_than]
+        for start in range(0, len(candidates), 1000):
+            batch = candidates[start:start + 1000]
+            keep = set(referenced(batch))
+            for content_hash in batch:
+                if content_hash not in keep:
+                    path = self.path(content_hash)
+                    try:
+                        size = path.stat().st_size
+                        path.unlink()
+                    except FileNotFoundError:
+                        continue
+                    deleted += 1
+                    freed += size
+        return deleted, freed
+
+    def _upload_dir(self, upload_id) -> Path:
+        return self.root / "uploads" / str(uuid.UUID(str(upload_id)))
+
+    def _temp_file(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=directory, prefix=".tmp-", delete=False)
+
+    def _write_chunks(self, tmp, chunks, max_size):
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise BlobTooLarge(max_size)
+            digest.update(chunk)
+            tmp.write(chunk)
+        return digest.hexdigest(), size
+
+    @contextmanager
+    def _discard_on_error(self, tmp):
+        try:
+            yield
+        except BaseException:
+            tmp.close()
+            if os.path.exists(tmp.name):
+                os.unlink(tmp.name)
+            raise
+
+    def _commit(self, tmp, target: Path):
+        if target.exists():
+            # Already stored: skip the fsync, and refresh the mtime so
+            # prune_unreferenced() leaves it alone while this upload commits.
+            tmp.close()
+            os.unlink(tmp.name)
+            os.utime(target)
+            return
+        # os.replace is atomic on POSIX, so readers never see a partial blob.
+        tmp.flush()
+        os.fsync(tmp.fileno())
+        tmp.close()
+        os.replace(tmp.name, target)
+
+
+def get_blob_store():
+    backend = getattr(settings, "BLOB_STORE_BACKEND", "api.blob_store.FileSystemBlobStore")
+    options = getattr(settings, "BLOB_STORE_OPTIONS", {})
+    return import_string(backend)(**options)
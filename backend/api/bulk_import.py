@@ -0,0 +1,279 @@
+# api/bulk_import.py
+"""Bulk employee onboarding from CSV or NDJSON.
+
+Rows are streamed, validated a batch at a time, and written with
+bulk_create: one transaction per batch, holding four INSERTs (Employee,
+PersonalInfo, ContactInfo, EmploymentInfo) plus a ledger entry. A bad row
+is reported and skipped; the rest of its batch is still imported.
+
+Columns (CSV header or NDJSON keys) match the profile API: email
+(required), password or passwordHash, firstName, lastName, dateOfBirth,
+mobile, address, jobDesignation, department. passwordHash takes a hash in
+api.passwords' format, e.g. exported from another system. Rows with
+neither get an unusable hash; an issuer sends those employees an invite
+(POST /employees/{id}/invite/) to choose a password.
+
+Plain passwords are hashed on the import pool (PASSWORD_KDF_IMPORT), which
+bounds throughput: scrypt at the default cost takes about 58 ms per hash,
+so 2 workers manage about 2,000 such rows a minute (4 workers about
+4,000). Pre-hashed and passwordless rows cost no hash and import at
+database speed. When the pool stays busy past its timeout, that batch's
+rows are reported as failed and the import moves on to the next batch.
+
+/employees/import/ only queues the file (EmployeeImport); run_employee_imports
+does the work outside the request, so an import of any size never holds
+a web worker.
+"""
+import csv
+import datetime
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import ledger
+from .auth_utils import sha256_hex
+from .empids import allocate_empid
+from .models import ContactInfo, Employee, EmployeeImport, EmploymentInfo, PersonalInfo
+from .passwords import PasswordHasherBusy, get_import_hasher, is_encoded
+from .verify_cache import forget_employees
+
+UNUSABLE_PASSWORD = "!"
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+    max_errors: int = 1000
+
+    def error(self, row_number: int, message: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "error": message})
+
+    def as_dict(self):
+        return {
+            "ok": self.failed == 0,
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errorsTruncated": self.failed > len(self.errors),
+        }
+
+
+def iter_rows(lines, fmt: str):
+    """Yield dict rows from an iterable of text lines."""
+    if fmt == "csv":
+        yield from csv.DictReader(lines)
+    elif fmt == "ndjson":
+        for line in lines:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield line  # reported as a bad row by _build
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _clean(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def _validated(instance):
+    # Like the profile API, blank fields are allowed; filled ones must be valid.
+    blank = [f.name for f in instance._meta.fields if getattr(instance, f.attname) in ("", None)]
+    instance.clean_fields(exclude=["empid", *blank])
+    return instance
+
+
+def _build(row):
+    """Validate one row and return (employee, password, personal, contact, employment)."""
+    if not isinstance(row, dict):
+        raise ValueError("Row is not a JSON object")
+    row = {k: _clean(v) for k, v in row.items() if k}
+    email = row.get("email") or ""
+    if not isinstance(email, str):
+        raise ValueError("email must be a string")
+    email = email.lower()
+    validate_email(email)
+
+    password, password_hash = row.get("password") or None, row.get("passwordHash") or None
+    if password is not None and not isinstance(password, str):
+        raise ValueError("password must be a string")
+    if password_hash is not None:
+        if password is not None:
+            raise ValueError("Give password or passwordHash, not both")
+        if not is_encoded(password_hash):
+            raise ValueError("passwordHash is not a supported password hash")
+
+    emp = Employee(email=email, password_hash=password_hash or UNUSABLE_PASSWORD)
+    personal = contact = employment = None
+    if row.get("firstName") or row.get("lastName") or row.get("dateOfBirth"):
+        dob = row.get("dateOfBirth")
+        personal = _validated(PersonalInfo(
+            firstname=row.get("firstName") or "",
+            lastname=row.get("lastName") or "",
+            dob=datetime.date.fromisoformat(dob) if dob else None,
+        ))
+    if row.get("mobile") or row.get("address"):
+        contact = _validated(ContactInfo(
+            mobile=row.get("mobile") or "", address=row.get("address") or "", email=email
+        ))
+    if row.get("jobDesignation") or row.get("department"):
+        employment = _validated(EmploymentInfo(
+            job_designation=row.get("jobDesignation") or "", department=row.get("department") or ""
+        ))
+    return emp, password, personal, contact, employment
+
+
+def _describe(exc) -> str:
+    if isinstance(exc, ValidationError):
+        if hasattr(exc, "message_dict"):
+            return "; ".join(f"{k}: {' '.join(v)}" for k, v in exc.message_dict.items())
+        return " ".join(exc.messages)
+    return str(exc) or exc.__class__.__name__
+
+
+def _import_batch(batch, report: ImportReport):
+    built = []
+    for row_number, row in batch:
+        try:
+            built.append((row_number, *_build(row)))
+        except (ValidationError, ValueError, TypeError, AttributeError) as exc:
+            report.error(row_number, _describe(exc))
+
+    # Drop emails that already exist or repeat within the batch (one query).
+    emails = [item[1].email for item in built]
+    taken = set(Employee.objects.filter(email__in=emails).values_list("email", flat=True))
+    fresh = []
+    for item in built:
+        email = item[1].email
+        if email in taken:
+            report.error(item[0], "Email already registered")
+        else:
+            taken.add(email)
+            fresh.append(item)
+    if not fresh:
+        return
+
+    with_password = [item for item in fresh if item[2]]
+    try:
+        hashes = iter(get_import_hasher().encode_many([item[2] for item in with_password]))
+    except PasswordHasherBusy:
+        for item in fresh:
+            report.error(item[0], "Password hashing busy; row not imported")
+        return
+    password_hashes = {item[0]: next(hashes) for item in with_password}
+
+    employees, personal, contact, employment = [], [], [], []
+    stamp = str(time.time())
+    for row_number, emp, _, p, c, e in fresh:
+        emp.empid = allocate_empid()
+        emp.password_hash = password_hashes.get(row_number, emp.password_hash)
+        emp.user_hash = sha256_hex(emp.email + stamp + emp.empid)
+        employees.append(emp)
+        for info, bucket in ((p, personal), (c, contact), (e, employment)):
+            if info is not None:
+                info.empid = emp
+                bucket.append(info)
+
+    try:
+        with transaction.atomic():
+            Employee.objects.bulk_create(employees)
+            PersonalInfo.objects.bulk_create(personal)
+            ContactInfo.objects.bulk_create(contact)
+            EmploymentInfo.objects.bulk_create(employment)
+            empids = [emp.empid for emp in employees]
+            ledger.append("employees.imported", empids[0], {
+                "count": len(empids),
+                "empids": ledger.digest(empids),
+            })
+    except IntegrityError as exc:
+        # Lost a race with a concurrent registration; nothing in this batch was written.
+        for item in fresh:
+            report.error(item[0], f"Batch rolled back: {exc}")
+        return
+    forget_employees(*empids)  # drop any cached "no such employee"
+    report.created += len(employees)
+
+
+def import_employees(rows, batch_size: int = 1000, max_errors: int = 1000) -> ImportReport:
+    """Import an iterable of dict rows; row numbers in the report start at 1."""
+    report = ImportReport(max_errors=max_errors)
+    batch = []
+    for row_number, row in enumerate(rows, start=1):
+        batch.append((row_number, row))
+        if len(batch) >= batch_size:
+            _import_batch(batch, report)
+            batch = []
+    if batch:
+        _import_batch(batch, report)
+    return report
+
+
+def import_root() -> Path:
+    return Path(getattr(settings, "EMPLOYEE_IMPORT_ROOT", Path(settings.BASE_DIR) / "imports"))
+
+
+def queue_import(chunks, file_name: str, fmt: str) -> EmployeeImport:
+    """Spool an uploaded file to EMPLOYEE_IMPORT_ROOT and queue it for run_employee_imports."""
+    job = EmployeeImport(file_name=file_name[:255], format=fmt)
+    root = import_root()
+    root.mkdir(parents=True, exist_ok=True)
+    partial = root / f".tmp-{job.id}"
+    with open(partial, "wb") as fh:
+        for chunk in chunks:
+            fh.write(chunk)
+    os.replace(partial, root / str(job.id))
+    job.save()
+    return job
+
+
+def claim_import(stale_seconds: int):
+    """Mark the oldest pending import running and return it, or None.
+
+    An import still "running" after stale_seconds is assumed to have lost its
+    worker and is claimed again. Rerunning is safe: rows it already created
+    are reported as "Email already registered" instead of imported twice.
+    """
+    features = connections[router.db_for_write(EmployeeImport)].features
+    stale = timezone.now() - datetime.timedelta(seconds=stale_seconds)
+    with transaction.atomic():
+        job = (
+            EmployeeImport.objects
+            .filter(Q(status=EmployeeImport.PENDING) | Q(status=EmployeeImport.RUNNING, started_at__lt=stale))
+            .select_for_update(skip_locked=features.has_select_for_update_skip_locked)
+            .order_by("created_at")
+            .first()
+        )
+        if job is not None:
+            job.status, job.started_at = EmployeeImport.RUNNING, timezone.now()
+            job.save(update_fields=["status", "started_at"])
+    return job
+
+
+def run_import(job: EmployeeImport, batch_size: int = 1000) -> EmployeeImport:
+    """Import a claimed job's file, store its report and delete the file."""
+    path = import_root() / str(job.id)
+    try:
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            report = import_employees(iter_rows(fh, job.format), batch_size=batch_size)
+    except (OSError, UnicodeDecodeError, csv.Error) as exc:
+        job.status, job.report = EmployeeImport.FAILED, {"ok": False, "error": str(exc)}
+    else:
+        job.status, job.report = EmployeeImport.DONE, report.as_dict()
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "report", "finished_at"])
+    path.unlink(missing_ok=True)
+    return job
@@ -0,0 +1,55 @@
+# api/caching.py
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with optional per-entry expiry.
+
+    Expiry times are wall-clock epoch seconds, so they can come straight
+    from a JWT ``exp`` claim.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at: float | None = None):
+        if self.maxsize <= 0:
+            return
+        if self.ttl is not None:
+            ttl_expiry = time.time() + self.ttl
+            expires_at = ttl_expiry if expires_at is None else min(expires_at, ttl_expiry)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
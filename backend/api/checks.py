@@ -0,0 +1,25 @@
+# api/checks.py
+from pathlib import Path
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+from .blob_store import FileSystemBlobStore, get_blob_store
+
+
+@register()
+def blob_store_not_public(app_configs, **kwargs):
+    """The blob store must not sit under MEDIA_ROOT, which is served without auth."""
+    store = get_blob_store()
+    media_root = getattr(settings, "MEDIA_ROOT", "")
+    if not isinstance(store, FileSystemBlobStore) or not media_root:
+        return []
+    root, media = Path(store.root).resolve(), Path(media_root).resolve()
+    if root == media or root.is_relative_to(media):
+        return [Error(
+            f"Blob store root {root} is inside MEDIA_ROOT, so stored documents can be "
+            "fetched from MEDIA_URL without any ownership check.",
+            hint="Point BLOB_STORE_OPTIONS['root'] outside MEDIA_ROOT.",
+            id="api.E001",
+        )]
+    return []
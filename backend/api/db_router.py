@@ -0,0 +1,133 @@
+# api/db_router.py
+"""Primary/replica routing with read-your-writes pinning.
+
+Writes always go to ``default``. Reads go to a random alias from
+DATABASE_REPLICAS, but only inside views marked with @replica_reads, and
+only while the request has not written anything. After a request writes,
+the rest of it reads from the primary. PrimaryPinningMiddleware also sets a
+short-lived cookie, so the same client's next requests (say, GET /profile/
+right after PUT /profile/) keep reading from the primary until replicas
+have caught up.
+
+Routing state lives in a context variable, so it follows a request into
+sync_to_async worker threads under ASGI.
+"""
+import contextvars
+import functools
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = "db_pin"
+
+
+class RoutingState:
+    __slots__ = ("use_replica", "pinned", "wrote")
+
+    def __init__(self, pinned=False):
+        self.use_replica = False
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = contextvars.ContextVar("db_routing_state", default=None)
+
+
+def replica_aliases():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        aliases = replica_aliases()
+        if not aliases or state is None or not state.use_replica or state.pinned:
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # every alias holds the same data
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        return db not in replica_aliases()
+
+
+def pinned_to_primary() -> bool:
+    """True once this request has written or its client is pinned to the primary."""
+    state = _state.get()
+    return state is not None and state.pinned
+
+
+def replica_reads(view):
+    """Let a read-only view's queries go to a replica (see module docstring)."""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            state = _state.get()
+            if state is None:
+                return await view(*args, **kwargs)
+            state.use_replica = True
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                state.use_replica = False
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        state = _state.get()
+        if state is None:
+            return view(*args, **kwargs)
+        state.use_replica = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            state.use_replica = False
+    return wrapper
+
+
+class PrimaryPinningMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(state, response)
+
+    async def __acall__(self, request):
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(state, response)
+
+    def _pin(self, state, response):
+        if state.wrote and replica_aliases():
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=getattr(settings, "REPLICA_PIN_SECONDS", 10),
+                httponly=True, samesite="Lax",
+            )
+        return response
@@ -0,0 +1,33 @@
+# api/documents.py
+"""Reference counting between Documents and their shared DocumentContent.
+
+Every Document points at one DocumentContent row per distinct file, so
+uploading bytes that are already stored costs one UPDATE, not another copy.
+ref_count tracks the Documents pointing at a content row. When it reaches
+zero the row goes too. The blob itself is left for prune_blobs, because an
+upload of the same bytes may be writing it at that very moment.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import DocumentContent
+
+
+def add_content_reference(content_hash: str, size: int):
+    """Count one more Document for content_hash, creating its row on first use."""
+    if DocumentContent.objects.filter(pk=content_hash).update(ref_count=F("ref_count") + 1):
+        return
+    try:
+        with transaction.atomic():
+            DocumentContent.objects.create(content_hash=content_hash, size=size, ref_count=1)
+    except IntegrityError:
+        # A concurrent upload of the same bytes created the row first.
+        DocumentContent.objects.filter(pk=content_hash).update(ref_count=F("ref_count") + 1)
+
+
+def release_content_reference(content_hash: str):
+    """Drop one reference; delete the content row once nothing points at it."""
+    DocumentContent.objects.filter(pk=content_hash, ref_count__gt=0).update(
+        ref_count=F("ref_count") - 1
+    )
+    DocumentContent.objects.filter(pk=content_hash, ref_count=0).delete()
@@ -0,0 +1,118 @@
+# api/downloads.py
+"""Serve stored document bytes with conditional and ranged requests.
+
+The ETag is the content hash, so it is strong: the same bytes always carry
+the same tag, whichever document row points at them. One byte range per
+request is honoured (``bytes=a-b``, ``bytes=a-``, ``bytes=-n``); multi-range
+requests get the whole body, which RFC 9110 allows.
+
+With DOCUMENT_SENDFILE set, Python only authorizes the request and the
+front proxy reads the file itself (and answers Range on its own):
+
+- ``"x-sendfile"`` (Apache mod_xsendfile, lighttpd): the absolute blob path.
+- ``"x-accel-redirect"`` (nginx): DOCUMENT_SENDFILE_PREFIX plus the blob's
+  path under the store root, e.g. ``/protected-blobs/ab/cd/<sha256>`` for an
+  ``internal`` location aliased to BLOB_STORE_OPTIONS["root"].
+"""
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, parse_etags, quote_etag
+
+from .blob_store import CHUNK_SIZE
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_byte_range(header: str, size: int):
+    """Return (start, end) inclusive for a single-range header, or None to send everything.
+
+    Raises RangeNotSatisfiable when the range lies wholly past the end.
+    """
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None  # invalid, so the header is ignored
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _iter_range(fh, start: int, end: int):
+    with fh:
+        fh.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _sendfile_response(store, content_hash: str):
+    mode = getattr(settings, "DOCUMENT_SENDFILE", None)
+    if not mode:
+        return None
+    path = store.path(content_hash)
+    response = HttpResponse()
+    if mode == "x-accel-redirect":
+        prefix = getattr(settings, "DOCUMENT_SENDFILE_PREFIX", "/protected-blobs/")
+        response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + path.relative_to(store.root).as_posix()
+    elif mode == "x-sendfile":
+        response["X-Sendfile"] = str(path)
+    else:
+        raise ValueError(f"Unknown DOCUMENT_SENDFILE mode: {mode!r}")
+    return response
+
+
+def blob_response(request, store, content_hash: str, size: int, content_type: str, filename: str):
+    """Build the response for one stored blob, honouring If-None-Match and Range."""
+    etag = quote_etag(content_hash)
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in parse_etags(if_none_match)):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    response = _sendfile_response(store, content_hash)
+    if response is None:
+        byte_range = None
+        range_header = request.headers.get("Range")
+        if_range = request.headers.get("If-Range")
+        if range_header and (not if_range or if_range.strip() == etag):
+            try:
+                byte_range = parse_byte_range(range_header, size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                response["Accept-Ranges"] = "bytes"
+                return response
+        fh = store.open(content_hash)
+        if byte_range is None:
+            response = FileResponse(fh, content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(_iter_range(fh, start, end), status=206, content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(end - start + 1)
+    response["Content-Type"] = content_type
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    # Revalidate every time; the ETag makes that a cheap 304.
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,86 @@
+# api/empids.py
+"""Employee ID allocation from a database sequence, one block at a time.
+
+Each process reserves EMPID_BLOCK_SIZE consecutive numbers with a single
+atomic UPDATE on its EmpidSequence row, then hands them out from memory.
+IDs are unique by construction, so registration needs no existence checks
+or retries. Numbers left in a block when a process exits are skipped.
+
+IDs look like E000000042: the prefix plus the number zero-padded to fill
+the 10-character empid column. Legacy random IDs all start with "emp", so
+the two formats never collide.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import EmpidSequence
+
+SEQUENCE_NAME = "empid"
+EMPID_LENGTH = 10
+
+
+class EmpidExhausted(Exception):
+    pass
+
+
+class EmpidAllocator:
+    def __init__(self, prefix: str = "E", block_size: int = 100, sequence: str = SEQUENCE_NAME):
+        self.prefix = prefix
+        self.sequence = sequence
+        self.width = EMPID_LENGTH - len(prefix)
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._next = self._end = 0
+
+    def allocate(self) -> str:
+        with self._lock:
+            # A forked worker must not reuse the block its parent reserved.
+            if self._next >= self._end or self._pid != os.getpid():
+                self._next, self._end = self._reserve_block()
+                self._pid = os.getpid()
+            value = self._next
+            self._next += 1
+        if value >= 10 ** self.width:
+            raise EmpidExhausted(f"No {self.prefix}-prefixed employee IDs left")
+        return f"{self.prefix}{value:0{self.width}d}"
+
+    def _reserve_block(self):
+        with transaction.atomic():
+            reserved = EmpidSequence.objects.filter(name=self.sequence).update(
+                next_value=F("next_value") + self.block_size
+            )
+            if not reserved:
+                # Normally seeded by migration 0009; start the sequence at 1.
+                EmpidSequence.objects.create(name=self.sequence, next_value=1 + self.block_size)
+            # The UPDATE holds the row lock; read our new end back on the same connection.
+            end = (
+                EmpidSequence.objects.select_for_update()
+                .values_list("next_value", flat=True)
+                .get(name=self.sequence)
+            )
+        return end - self.block_size, end
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator() -> EmpidAllocator:
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = EmpidAllocator(
+                    prefix=getattr(settings, "EMPID_PREFIX", "E"),
+                    block_size=getattr(settings, "EMPID_BLOCK_SIZE", 100),
+                )
+    return _allocator
+
+
+def allocate_empid() -> str:
+    return get_allocator().allocate()
@@ -0,0 +1,108 @@
+# api/export.py
+"""Streaming export of employee profiles and their latest document hashes.
+
+Employees are read in keyset pages (empid > last seen), one annotated query
+per page, so memory stays flat however large the table grows. This also
+holds on MySQL, where QuerySet.iterator() buffers the whole result. Formats
+are CSV, NDJSON and, when pyarrow is installed, Parquet.
+"""
+import csv
+import io
+
+from .models import Employee
+from .profiles import serialize_profile, with_profile
+from .renderers import dumps
+
+COLUMNS = [
+    "employeeId", "email", "firstName", "lastName", "dateOfBirth", "mobile",
+    "address", "jobDesignation", "department", "userHash", "documentHash",
+]
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportUnavailable(Exception):
+    pass
+
+
+def iter_profile_pages(page_size: int = 2000):
+    """Yield lists of profile dicts, ordered by empid."""
+    employees = with_profile(Employee.objects.only("empid", "email", "user_hash")).order_by("empid")
+    last = None
+    while True:
+        page = employees if last is None else employees.filter(empid__gt=last)
+        rows = [serialize_profile(emp) for emp in page[:page_size]]
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]["employeeId"]
+
+
+def _csv(pages):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for rows in pages:
+        writer.writerows([[row[c] or "" for c in COLUMNS] for row in rows])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _ndjson(pages):
+    for rows in pages:
+        yield b"".join(dumps({c: row[c] for c in COLUMNS}) + b"\n" for row in rows)
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only stream whose buffered bytes are handed out between row groups."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def _parquet(pages):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportUnavailable("Parquet export requires pyarrow")
+    schema = pa.schema([(c, pa.string()) for c in COLUMNS])
+
+    def stream():
+        sink = _DrainableSink()
+        with pq.ParquetWriter(sink, schema) as writer:
+            for rows in pages:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                yield sink.drain()
+        yield sink.drain()  # footer
+
+    return stream()
+
+
+ENCODERS = {"csv": _csv, "ndjson": _ndjson, "parquet": _parquet}
+
+
+def export_profiles(fmt: str, page_size: int = 2000):
+    """Return an iterator of byte chunks encoding every profile as fmt.
+
+    Raises ValueError for an unknown format and ExportUnavailable when the
+    format's optional dependency is missing, before any row is read.
+    """
+    if fmt not in ENCODERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return ENCODERS[fmt](iter_profile_pages(page_size))
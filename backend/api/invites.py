@@ -0,0 +1,39 @@
+# api/invites.py
+"""One-time tokens that let an employee choose their own password.
+
+Imported employees without a password have an unusable hash and cannot
+log in. An issuer creates an invite (POST /employees/{id}/invite/) and
+hands the token to the employee, who redeems it at /auth/set-password/.
+
+The token is signed with SECRET_KEY and expires after EMPLOYEE_INVITE_MAX_AGE
+seconds. It also binds a digest of the current password hash, so it stops
+working as soon as any password is set, and no server-side state is kept.
+"""
+from django.conf import settings
+from django.core import signing
+
+from .auth_utils import sha256_hex
+
+SALT = "api.invites"
+
+
+def _fingerprint(password_hash: str) -> str:
+    return sha256_hex(password_hash)[:16]
+
+
+def make_invite_token(emp) -> str:
+    return signing.dumps([emp.empid, _fingerprint(emp.password_hash)], salt=SALT)
+
+
+def read_invite_token(token: str):
+    """Return (empid, password hash fingerprint), or None if invalid or expired."""
+    max_age = getattr(settings, "EMPLOYEE_INVITE_MAX_AGE", 7 * 86400)
+    try:
+        empid, fingerprint = signing.loads(token, salt=SALT, max_age=max_age)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    return empid, fingerprint
+
+
+def invite_matches(emp, fingerprint: str) -> bool:
+    return _fingerprint(emp.password_hash) == fingerprint
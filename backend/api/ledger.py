@@ -0,0 +1,93 @@
+# api/ledger.py
+"""Append-only, hash-chained log of document and profile events.
+
+Every entry stores the previous entry's hash and its own hash over
+(prev_hash, event type, empid, timestamp, payload). Rewriting any entry
+breaks every hash after it. The audit walks the chain from the last
+checkpoint, so a re-audit only re-hashes the new tail.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import LedgerCheckpoint, LedgerEntry
+
+GENESIS_HASH = "0" * 64
+CHECKPOINT_ID = 1
+
+
+def canonical_json(payload) -> str:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+
+def digest(payload) -> str:
+    """SHA-256 of a payload, for recording a change without storing its values."""
+    return hashlib.sha256(canonical_json(payload).encode()).hexdigest()
+
+
+def compute_entry_hash(prev_hash: str, event_type: str, empid: str, created_at, payload) -> str:
+    material = "|".join([prev_hash, event_type, empid, created_at.isoformat(), canonical_json(payload)])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def append(event_type: str, empid: str, payload) -> LedgerEntry:
+    """Append an entry. Call inside the transaction that makes the change."""
+    if not transaction.get_connection().in_atomic_block:
+        raise RuntimeError("ledger.append() must run inside transaction.atomic()")
+    # Locking the tail serialises writers; the unique prev_hash catches any fork.
+    prev_hash = (
+        LedgerEntry.objects.select_for_update()
+        .order_by("-id")
+        .values_list("entry_hash", flat=True)
+        .first()
+    ) or GENESIS_HASH
+    created_at = timezone.now()
+    return LedgerEntry.objects.create(
+        event_type=event_type,
+        empid=empid,
+        payload=payload,
+        prev_hash=prev_hash,
+        entry_hash=compute_entry_hash(prev_hash, event_type, empid, created_at, payload),
+        created_at=created_at,
+    )
+
+
+@dataclass
+class AuditResult:
+    ok: bool
+    checked: int
+    last_id: int
+    broken_id: int | None = None
+
+
+def audit(full: bool = False, chunk_size: int = 5000) -> AuditResult:
+    """Verify the chain after the checkpoint (or from genesis when full)."""
+    checkpoint = None if full else LedgerCheckpoint.objects.filter(pk=CHECKPOINT_ID).first()
+    if checkpoint:
+        last_id, prev_hash = checkpoint.entry_id, checkpoint.entry_hash
+        # The anchor row itself must still carry the hash we checkpointed.
+        anchored = LedgerEntry.objects.filter(id=last_id).values_list("entry_hash", flat=True).first()
+        if anchored != prev_hash:
+            return AuditResult(ok=False, checked=0, last_id=last_id, broken_id=last_id)
+    else:
+        last_id, prev_hash = 0, GENESIS_HASH
+
+    checked = 0
+    entries = LedgerEntry.objects.filter(id__gt=last_id).order_by("id")
+    for entry in entries.iterator(chunk_size=chunk_size):
+        expected = compute_entry_hash(
+            prev_hash, entry.event_type, entry.empid, entry.created_at, entry.payload
+        )
+        if entry.prev_hash != prev_hash or entry.entry_hash != expected:
+            return AuditResult(ok=False, checked=checked, last_id=last_id, broken_id=entry.id)
+        prev_hash, last_id = entry.entry_hash, entry.id
+        checked += 1
+
+    if last_id:
+        LedgerCheckpoint.objects.update_or_create(
+            pk=CHECKPOINT_ID, defaults={"entry_id": last_id, "entry_hash": prev_hash}
+        )
+    return AuditResult(ok=True, checked=checked, last_id=last_id)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import ledger
+
+
+class Command(BaseCommand):
+    help = "Verify the ledger hash chain from the last checkpoint (or from genesis with --full)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Ignore the checkpoint and re-hash the whole chain",
+        )
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        result = ledger.audit(full=options["full"], chunk_size=options["chunk_size"])
+        if not result.ok:
+            raise CommandError(
+                f"Ledger broken at entry #{result.broken_id} "
+                f"(last good entry #{result.last_id}, {result.checked} checked this run)"
+            )
+        self.stdout.write(f"Ledger OK through entry #{result.last_id} ({result.checked} new entries checked)")
@@ -0,0 +1,261 @@
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.auth_utils import create_jwt, sha256_hex
+from api.blob_store import get_blob_store
+from api.metrics import QueryRecorder
+from api.models import (
+    ContactInfo, Document, DocumentContent, Employee, EmploymentInfo, PersonalInfo,
+)
+from api.passwords import hash_password
+
+SCENARIOS = ["register", "login", "me", "profile_put", "documents", "verify"]
+PASSWORD = "bench-password-123"
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API in-process against a throwaway test database: seed employees "
+        "and documents, drive each endpoint with concurrent clients and report latency "
+        "percentiles, throughput, queries per request and peak RSS as JSON. With "
+        "--baseline, exit non-zero when a scenario regresses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, default=1000)
+        parser.add_argument("--documents", type=int, default=2, help="Documents per employee")
+        parser.add_argument(
+            "--document-sizes", default="4096",
+            help="Comma separated byte sizes, cycled over seeded documents",
+        )
+        parser.add_argument("--upload-size", type=int, default=65536)
+        parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+        parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--output", help="Also write the JSON report here (e.g. a new baseline)")
+        parser.add_argument("--baseline", help="Earlier report to compare against")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.25,
+            help="Allowed relative worsening of p95, throughput and queries/request",
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [s for s in options["scenarios"].split(",") if s]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as fh:
+                    baseline = json.load(fh)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline: {exc}")
+
+        workdir = tempfile.mkdtemp(prefix="bench-")
+        saved_settings = {key: connection.settings_dict[key] for key in ("TEST", "OPTIONS")}
+        if connection.vendor == "sqlite":
+            self._use_file_database(workdir)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # One client address drives every scenario, so rate limits would skew the numbers.
+            blob_options = {"root": os.path.join(workdir, "blobs")}
+            with override_settings(BLOB_STORE_OPTIONS=blob_options, API_THROTTLE_RATES={}):
+                self.random = random.Random(options["seed"])
+                seeded = self._seed(options)
+                results = {name: self._run(name, seeded, options) for name in scenarios}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            connection.settings_dict.update(saved_settings)
+            teardown_test_environment()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        report = {
+            "config": {
+                key: options[key] for key in (
+                    "employees", "documents", "document_sizes", "upload_size",
+                    "requests", "concurrency", "seed",
+                )
+            },
+            "database": connection.vendor,
+            "scenarios": results,
+            "peak_rss_kb": self._peak_rss_kb(),
+        }
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(output + "\n")
+
+        if baseline:
+            regressions = self._compare(baseline, report, options["tolerance"])
+            for line in regressions:
+                self.stderr.write(f"REGRESSION {line}")
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+
+    def _use_file_database(self, workdir):
+        # SQLite's default test database is in memory with a shared cache, where
+        # a second writer fails at once with "database table is locked". In a
+        # file, writers queue on the lock: the busy timeout makes them wait,
+        # and IMMEDIATE transactions take the lock up front, so a reader never
+        # has to upgrade to a writer mid-transaction (which cannot wait).
+        settings_dict = connection.settings_dict
+        settings_dict["TEST"] = {**settings_dict["TEST"], "NAME": os.path.join(workdir, "bench.sqlite3")}
+        settings_dict["OPTIONS"] = {**settings_dict["OPTIONS"], "timeout": 30, "transaction_mode": "IMMEDIATE"}
+
+    def _seed(self, options):
+        password_hash = hash_password(PASSWORD)  # one KDF run, shared by every seeded account
+        sizes = [int(s) for s in options["document_sizes"].split(",") if s]
+        store = get_blob_store()
+        employees, personal, contact, employment, documents = [], [], [], [], []
+        contents, latest = {}, {}
+        for n in range(options["employees"]):
+            empid = f"B{n:09d}"
+            email = f"bench{n}@example.com"
+            emp = Employee(
+                empid=empid, email=email, password_hash=password_hash, user_hash=sha256_hex(email)
+            )
+            employees.append(emp)
+            personal.append(PersonalInfo(empid=emp, firstname="Bench", lastname="User"))
+            contact.append(ContactInfo(empid=emp, mobile="5550100", email=email, address="1 Bench St"))
+            employment.append(EmploymentInfo(empid=emp, job_designation="Engineer", department="R&D"))
+            for d in range(options["documents"]):
+                size = sizes[(n + d) % len(sizes)]
+                content_hash, size = store.save_stream([self.random.randbytes(size)])
+                content = contents.setdefault(
+                    content_hash, DocumentContent(content_hash=content_hash, size=size)
+                )
+                content.ref_count += 1
+                documents.append(Document(
+                    empid=emp, document_name=f"doc{d}.pdf", document_type="application/pdf",
+                    document_hash=content_hash, content=content,
+                ))
+                latest[empid] = content_hash
+        for model, rows in (
+            (Employee, employees), (PersonalInfo, personal), (ContactInfo, contact),
+            (EmploymentInfo, employment), (DocumentContent, list(contents.values())),
+            (Document, documents),
+        ):
+            model.objects.bulk_create(rows, batch_size=1000)
+        return [(emp.empid, emp.email, latest.get(emp.empid, "0" * 64)) for emp in employees]
+
+    def _request(self, name, client, seeded, options, sequence):
+        empid, email, document_hash = self.random.choice(seeded)
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {create_jwt(empid)}"}
+        if name == "register":
+            return client.post(
+                "/api/auth/register/",
+                {"email": f"new{sequence}-{os.getpid()}@example.com", "password": PASSWORD},
+                content_type="application/json",
+            )
+        if name == "login":
+            return client.post(
+                "/api/auth/login/", {"email": email, "password": PASSWORD},
+                content_type="application/json",
+            )
+        if name == "me":
+            return client.get("/api/me/", **auth)
+        if name == "profile_put":
+            first_name = "".join(self.random.choice("abcdefghij") for _ in range(8)).title()
+            return client.put(
+                "/api/profile/", {"firstName": first_name}, content_type="application/json", **auth
+            )
+        if name == "documents":
+            data = self.random.randbytes(options["upload_size"])
+            upload = SimpleUploadedFile("bench.pdf", data, content_type="application/pdf")
+            return client.post("/api/documents/", {"file": upload}, **auth)
+        return client.post(
+            "/api/verify/", {"employeeId": empid, "hash": document_hash},
+            content_type="application/json",
+        )
+
+    def _run(self, name, seeded, options):
+        total, concurrency = options["requests"], options["concurrency"]
+        counter = iter(range(total))
+        counter_lock = threading.Lock()
+        samples = []
+
+        def client_loop():
+            client = Client()
+            local = []
+            try:
+                while True:
+                    with counter_lock:
+                        sequence = next(counter, None)
+                    if sequence is None:
+                        break
+                    recorder = QueryRecorder(keep_sql=False)
+                    started = time.perf_counter()
+                    with connection.execute_wrapper(recorder):
+                        try:
+                            status = self._request(name, client, seeded, options, sequence).status_code
+                        except Exception:
+                            status = 599
+                    local.append((time.perf_counter() - started, recorder.count, status))
+            finally:
+                connection.close()
+                samples.extend(local)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(client_loop) for _ in range(concurrency)]:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        ok = sorted(latency * 1000 for latency, _, status in samples if status < 400)
+        return {
+            "requests": len(samples),
+            "errors": sum(1 for _, _, status in samples if status >= 400),
+            "throughput_rps": round(len(samples) / elapsed, 1),
+            "p50_ms": round(percentile(ok, 0.50), 2) if ok else None,
+            "p95_ms": round(percentile(ok, 0.95), 2) if ok else None,
+            "p99_ms": round(percentile(ok, 0.99), 2) if ok else None,
+            "queries_per_request": round(sum(q for _, q, _ in samples) / len(samples), 2),
+        }
+
+    def _peak_rss_kb(self):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS
+
+    def _compare(self, baseline, report, tolerance):
+        regressions = []
+        for name, current in report["scenarios"].items():
+            before = baseline.get("scenarios", {}).get(name)
+            if not before:
+                continue
+            if current["errors"] > before["errors"]:
+                regressions.append(f"{name}: errors {before['errors']} -> {current['errors']}")
+            # Cache hits make query counts vary a little between runs; an N+1 does not.
+            if current["queries_per_request"] > before["queries_per_request"] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: queries/request {before['queries_per_request']} -> "
+                    f"{current['queries_per_request']}"
+                )
+            if before["p95_ms"] and current["p95_ms"] and current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+            if current["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{name}: throughput {before['throughput_rps']} -> {current['throughput_rps']} req/s"
+                )
+        return regressions
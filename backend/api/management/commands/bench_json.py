@@ -0,0 +1,81 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from ninja.responses import NinjaJSONEncoder
+
+from api.api import ProfileResponse, UploadResponse, VerifyResponse
+from api.export import COLUMNS
+from api.renderers import dumps, orjson
+
+
+def _profile(n):
+    return {
+        "firstName": "Jane", "lastName": "Doe", "dateOfBirth": "1990-02-03", "mobile": "555 0100",
+        "email": f"jane{n}@example.com", "address": f"{n} Main Street", "jobDesignation": "Engineer",
+        "department": "R&D", "employeeId": f"emp{n:07d}", "userHash": f"{n:064x}",
+        "documentHash": f"{n + 1:064x}",
+    }
+
+
+def _json(data):
+    return json.dumps(data, cls=NinjaJSONEncoder).encode()
+
+
+def _ndjson(encode):
+    return lambda rows: b"".join(encode(row) + b"\n" for row in rows)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time JSON encoding per response type with json.dumps (Ninja's default renderer) "
+        "and api.renderers.dumps (orjson when installed), plus response-schema validation, "
+        "and print microseconds per response as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+        parser.add_argument("--batch-size", type=int, default=1000, help="Items in batch and export payloads")
+
+    def handle(self, *args, **options):
+        iterations, batch_size = options["iterations"], options["batch_size"]
+        verify = {"ok": True, "message": "✅ Document is UNTAMPERED - Hash matches the record."}
+        results = [{"employeeId": f"emp{n:07d}", "hash": f"{n:064x}", **verify} for n in range(batch_size)]
+        # name -> (payload, response schema, NDJSON rows?, rounds)
+        payloads = {
+            "profile": ({"ok": True, "profile": _profile(1)}, ProfileResponse, False, iterations),
+            "verify": (verify, VerifyResponse, False, iterations),
+            "upload": ({"ok": True, "documentId": 1, "documentHash": "ab" * 32}, UploadResponse, False, iterations),
+            "verify_batch": (
+                {"ok": True, "total": batch_size, "matched": batch_size, "results": results},
+                None, False, max(1, iterations // 100),
+            ),
+            # One export page, encoded as a single NDJSON chunk.
+            "export_page": (
+                [{c: _profile(n)[c] for c in COLUMNS} for n in range(batch_size)],
+                None, True, max(1, iterations // 100),
+            ),
+        }
+
+        report = {"orjson": orjson is not None, "batch_size": batch_size, "payloads": {}}
+        for name, (data, schema, ndjson, rounds) in payloads.items():
+            baseline, fast = (_ndjson(_json), _ndjson(dumps)) if ndjson else (_json, dumps)
+            entry = {
+                "bytes": len(fast(data)),
+                "json_us": self._time(baseline, data, rounds),
+                "fast_us": self._time(fast, data, rounds),
+            }
+            entry["speedup"] = round(entry["json_us"] / entry["fast_us"], 2) if entry["fast_us"] else None
+            if schema is not None:
+                entry["validate_us"] = self._time(
+                    lambda d: schema.model_validate(d).model_dump(exclude_unset=True), data, rounds
+                )
+            report["payloads"][name] = entry
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _time(self, fn, data, rounds):
+        fn(data)  # warm up
+        started = time.perf_counter()
+        for _ in range(rounds):
+            fn(data)
+        return round((time.perf_counter() - started) / rounds * 1e6, 2)
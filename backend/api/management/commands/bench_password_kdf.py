@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api.passwords import PasswordHasher
+
+
+class Command(BaseCommand):
+    help = "Report password verifications (logins) per second for each KDF cost setting."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--algorithm", choices=["scrypt", "pbkdf2_sha256"], default="scrypt")
+        parser.add_argument(
+            "--costs", default=None,
+            help="Comma separated costs: scrypt n (default 4096,16384,32768) "
+                 "or pbkdf2 iterations (default 100000,600000,1000000)",
+        )
+        parser.add_argument("--logins", type=int, default=64, help="Logins per cost setting")
+        parser.add_argument("--clients", type=int, default=16, help="Concurrent login requests")
+        parser.add_argument("--workers", type=int, default=4, help="Hashing pool size")
+        parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+
+    def handle(self, *args, **options):
+        algorithm = options["algorithm"]
+        default_costs = "4096,16384,32768" if algorithm == "scrypt" else "100000,600000,1000000"
+        costs = [int(c) for c in (options["costs"] or default_costs).split(",") if c]
+        cost_key = "n" if algorithm == "scrypt" else "iterations"
+
+        self.stdout.write(f"{cost_key:>10} {'logins/s':>10} {'ms/login':>10}")
+        for cost in costs:
+            hasher = PasswordHasher(
+                algorithm=algorithm,
+                executor=options["executor"],
+                workers=options["workers"],
+                max_pending=options["clients"],
+                timeout=60,
+                **{cost_key: cost},
+            )
+            try:
+                encoded = hasher.encode("correct horse battery staple")
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options["clients"]) as clients:
+                    results = list(clients.map(
+                        lambda _: hasher.verify("correct horse battery staple", encoded),
+                        range(options["logins"]),
+                    ))
+                elapsed = time.perf_counter() - started
+            finally:
+                hasher.shutdown()
+            assert all(results)
+            rate = options["logins"] / elapsed
+            self.stdout.write(f"{cost:>10} {rate:>10.1f} {1000 / rate:>10.1f}")
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management.base import BaseCommand
+
+from api.blob_store import FileSystemBlobStore
+
+
+class Command(BaseCommand):
+    help = "Measure peak Python memory of the streaming upload pipeline by file size."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default="1,16,64,256",
+            help="Comma separated file sizes in MiB (default: 1,16,64,256)",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",") if s]
+        root = tempfile.mkdtemp(prefix="bench-blobs-")
+        store = FileSystemBlobStore(root)
+        self.stdout.write(f"{'size MiB':>9} {'peak KiB':>10} {'seconds':>8}")
+        try:
+            for mib in sizes:
+                upload = self._make_upload(mib)
+                try:
+                    tracemalloc.start()
+                    started = time.perf_counter()
+                    store.save_stream(upload.chunks())
+                    elapsed = time.perf_counter() - started
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                finally:
+                    upload.close()
+                self.stdout.write(f"{mib:>9} {peak // 1024:>10} {elapsed:>8.2f}")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def _make_upload(self, mib: int):
+        upload = TemporaryUploadedFile("bench.bin", "application/octet-stream", 0, None)
+        block = os.urandom(1024 * 1024)
+        for _ in range(mib):
+            upload.write(block)
+        upload.size = mib * 1024 * 1024
+        upload.seek(0)
+        return upload
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.merkle import batch_pending_documents
+
+
+class Command(BaseCommand):
+    help = "Seal newly uploaded document hashes into Merkle batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-leaves", type=int, default=100000,
+            help="Maximum number of documents per batch (default: 100000)",
+        )
+
+    def handle(self, *args, **options):
+        batches = 0
+        while True:
+            batch = batch_pending_documents(options["max_leaves"])
+            if batch is None:
+                break
+            batches += 1
+            self.stdout.write(f"Batch {batch.pk}: {batch.leaf_count} leaves, root {batch.root}")
+        if not batches:
+            self.stdout.write("No pending documents.")
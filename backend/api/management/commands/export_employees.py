@@ -0,0 +1,39 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import ENCODERS, ExportUnavailable, export_profiles
+
+
+class Command(BaseCommand):
+    help = "Stream every employee profile and latest document hash as CSV, NDJSON or Parquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(ENCODERS), default="csv")
+        parser.add_argument("--output", "-o", default="-", help="Output path, or - for stdout.")
+        parser.add_argument(
+            "--page-size", type=int,
+            default=getattr(settings, "EMPLOYEE_EXPORT_PAGE_SIZE", 2000),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            chunks = export_profiles(options["format"], page_size=options["page_size"])
+        except ExportUnavailable as exc:
+            raise CommandError(str(exc))
+        path = options["output"]
+        try:
+            out = sys.stdout.buffer if path == "-" else open(path, "wb")
+        except OSError as exc:
+            raise CommandError(str(exc))
+        written = 0
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if path != "-":
+                out.close()
+        if path != "-":
+            self.stderr.write(f"Wrote {written} bytes to {path}")
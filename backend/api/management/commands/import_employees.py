@@ -0,0 +1,40 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk_import import import_employees, iter_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import employees and their profiles from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "ndjson"], default=None)
+        parser.add_argument(
+            "--batch-size", type=int,
+            default=getattr(settings, "EMPLOYEE_IMPORT_BATCH_SIZE", 1000),
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv")
+        started = time.perf_counter()
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as fh:
+                report = import_employees(iter_rows(fh, fmt), batch_size=options["batch_size"])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        for error in report.errors:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        rate = report.created / elapsed * 60 if elapsed else 0
+        self.stdout.write(json.dumps({
+            **report.as_dict(),
+            "errors": len(report.errors),
+            "seconds": round(elapsed, 2),
+            "employeesPerMinute": round(rate),
+        }))
@@ -0,0 +1,65 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive /me/ and /verify/ on a running server at increasing concurrency. "
+        "Point --base-url at /api (WSGI baseline) or /api/async (async handlers)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000/api")
+        parser.add_argument("--token", help="Access token for /me/ (skipped without one)")
+        parser.add_argument("--employee-id", default="emp1000001")
+        parser.add_argument("--hash", default="0" * 64)
+        parser.add_argument("--concurrency", default="1,8,32,64")
+        parser.add_argument("--requests", type=int, default=400, help="Requests per level")
+
+    def handle(self, *args, **options):
+        base = options["base_url"].rstrip("/")
+        targets = {}
+        if options["token"]:
+            targets["/me/"] = lambda: urllib.request.Request(
+                f"{base}/me/", headers={"Authorization": f"Bearer {options['token']}"}
+            )
+        body = json.dumps({"employeeId": options["employee_id"], "hash": options["hash"]}).encode()
+        targets["/verify/"] = lambda: urllib.request.Request(
+            f"{base}/verify/", data=body, headers={"Content-Type": "application/json"}
+        )
+
+        self.stdout.write(f"{'endpoint':<10} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for path, make_request in targets.items():
+            for concurrency in [int(c) for c in options["concurrency"].split(",") if c]:
+                rate, p50, p95, errors = self._run(make_request, concurrency, options["requests"])
+                self.stdout.write(
+                    f"{path:<10} {concurrency:>5} {rate:>9.1f} {p50:>8.1f} {p95:>8.1f} {errors:>7}"
+                )
+
+    def _run(self, make_request, concurrency, total):
+        def one(_):
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(make_request(), timeout=30) as res:
+                    res.read()
+                ok = True
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(total)))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency * 1000 for latency, ok in results if ok)
+        errors = sum(1 for _, ok in results if not ok)
+        if not latencies:
+            raise CommandError("Every request failed; is the server running?")
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return total / elapsed, statistics.median(latencies), p95, errors
@@ -0,0 +1,40 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.api import upload_session_cutoff
+from api.blob_store import get_blob_store
+from api.models import DocumentContent, UploadSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored blobs that no DocumentContent row references any more: content "
+        "whose last document was deleted, or assembled uploads that failed their hash check. "
+        "Also delete expired upload sessions (UPLOAD_SESSION_TTL) and staged parts no "
+        "session owns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-seconds", type=int, default=3600,
+            help="Keep blobs touched this recently; an upload may be about to reference them",
+        )
+
+    def handle(self, *args, **options):
+        def referenced(hashes):
+            return DocumentContent.objects.filter(pk__in=hashes).values_list("pk", flat=True)
+
+        def active(upload_ids):
+            return UploadSession.objects.filter(pk__in=upload_ids).values_list("pk", flat=True)
+
+        older_than = time.time() - options["grace_seconds"]
+        store = get_blob_store()
+        deleted, freed = store.prune_unreferenced(referenced, older_than=older_than)
+        _, counts = UploadSession.objects.filter(created_at__lt=upload_session_cutoff()).delete()
+        uploads, upload_bytes = store.prune_uploads(active, older_than=older_than)
+        self.stdout.write(json.dumps({
+            "deleted": deleted, "bytesFreed": freed + upload_bytes,
+            "expiredSessions": counts.get(UploadSession._meta.label, 0), "uploadsDeleted": uploads,
+        }))
@@ -0,0 +1,35 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.bulk_import import claim_import, run_import
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the bulk imports queued by /employees/import/, oldest first, until none "
+        "are pending. Safe to run from several workers at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int,
+            default=getattr(settings, "EMPLOYEE_IMPORT_BATCH_SIZE", 1000),
+        )
+        parser.add_argument(
+            "--stale-seconds", type=int, default=3600,
+            help="Claim imports left running this long by a worker that died",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_import(options["stale_seconds"])
+            if job is None:
+                break
+            job = run_import(job, batch_size=options["batch_size"])
+            report = job.report or {}
+            self.stdout.write(json.dumps({
+                "importId": str(job.id), "status": job.status,
+                "created": report.get("created", 0), "failed": report.get("failed", 0),
+            }))
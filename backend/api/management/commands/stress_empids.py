@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.empids import EmpidAllocator
+from api.models import EmpidSequence, Employee
+
+STRESS_SEQUENCE = "empid-stress"
+
+
+class Command(BaseCommand):
+    help = (
+        "Allocate employee IDs from many concurrent allocators (one per simulated worker) "
+        "and optionally insert them as employees, failing on any duplicate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=1000000)
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--block-size", type=int, default=1000)
+        parser.add_argument("--prefix", default="S", help="Keep stress IDs apart from real ones")
+        parser.add_argument(
+            "--register", action="store_true",
+            help="Insert an Employee per ID (bulk, no retries); removed again afterwards",
+        )
+
+    def handle(self, *args, **options):
+        per_worker = options["count"] // options["workers"]
+        EmpidSequence.objects.update_or_create(name=STRESS_SEQUENCE, defaults={"next_value": 1})
+
+        def worker(index):
+            allocator = EmpidAllocator(
+                prefix=options["prefix"], block_size=options["block_size"], sequence=STRESS_SEQUENCE
+            )
+            try:
+                empids = [allocator.allocate() for _ in range(per_worker)]
+                if options["register"]:
+                    Employee.objects.bulk_create(
+                        (
+                            Employee(
+                                empid=empid,
+                                email=f"{empid.lower()}@stress.invalid",
+                                password_hash="!",
+                                user_hash=f"stress-{empid}",
+                            )
+                            for empid in empids
+                        ),
+                        batch_size=1000,
+                    )
+                return empids
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            allocated = [empid for batch in pool.map(worker, range(options["workers"])) for empid in batch]
+        elapsed = time.perf_counter() - started
+
+        if options["register"]:
+            Employee.objects.filter(email__endswith="@stress.invalid").delete()
+        EmpidSequence.objects.filter(name=STRESS_SEQUENCE).delete()
+        if len(set(allocated)) != len(allocated):
+            raise CommandError("Duplicate employee IDs were allocated")
+        self.stdout.write(
+            f"{len(allocated)} unique IDs from {options['workers']} workers "
+            f"in {elapsed:.2f}s ({len(allocated) / elapsed:.0f}/s)"
+        )
@@ -0,0 +1,92 @@
+# api/merkle.py
+"""Merkle trees over document hashes.
+
+Leaves and inner nodes are domain separated so a leaf can never be passed
+off as an inner node:
+
+    leaf = sha256(0x00 || document_hash)
+    node = sha256(0x01 || left || right)
+
+An odd node at the end of a level is promoted unchanged instead of being
+paired with itself. A proof is a list of (side, sibling) steps from the leaf
+up to the root, where side says whether the sibling sits on the left ("L")
+or the right ("R").
+"""
+import hashlib
+
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef
+
+from .models import Document, MerkleBatch, MerkleLeaf
+
+
+def hash_leaf(document_hash: str) -> str:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(document_hash)).hexdigest()
+
+
+def hash_node(left: str, right: str) -> str:
+    return hashlib.sha256(b"\x01" + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def build_tree(document_hashes):
+    """Return (root, proofs) where proofs[i] proves document_hashes[i]."""
+    level = [hash_leaf(h) for h in document_hashes]
+    if not level:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+    proofs = [[] for _ in level]
+    # positions[i] is the index, in the current level, of the node above leaf i.
+    positions = list(range(len(level)))
+    while len(level) > 1:
+        for leaf, pos in enumerate(positions):
+            sibling = pos ^ 1
+            if sibling < len(level):
+                proofs[leaf].append(["L" if sibling < pos else "R", level[sibling]])
+            positions[leaf] = pos // 2
+        level = [
+            hash_node(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+    return level[0], proofs
+
+
+def root_from_proof(document_hash: str, proof) -> str:
+    node = hash_leaf(document_hash)
+    for side, sibling in proof:
+        node = hash_node(sibling, node) if side == "L" else hash_node(node, sibling)
+    return node
+
+
+def verify_proof(document_hash: str, proof, root: str) -> bool:
+    return root_from_proof(document_hash, proof) == root
+
+
+def batch_pending_documents(max_leaves: int = 100000):
+    """Seal documents that are not in any batch yet into one MerkleBatch.
+
+    Returns the new batch, or None when nothing is pending.
+
+    Pending means "has no leaf", not "id above the last sealed one": ids are
+    allocated before commit, so a slow upload can commit with a lower id
+    than a document that was already sealed. The pending rows are locked,
+    skipping rows another run holds where the database allows it, so
+    overlapping runs seal disjoint sets instead of colliding on the
+    one-leaf-per-document constraint.
+    """
+    features = connections[router.db_for_write(Document)].features
+    with transaction.atomic():
+        pending = Document.objects.filter(
+            ~Exists(MerkleLeaf.objects.filter(document=OuterRef("pk")))
+        ).select_for_update(skip_locked=features.has_select_for_update_skip_locked)
+        pending = list(pending.order_by("id").values_list("id", "document_hash")[:max_leaves])
+        if not pending:
+            return None
+        root, proofs = build_tree([document_hash for _, document_hash in pending])
+        batch = MerkleBatch.objects.create(root=root, leaf_count=len(pending))
+        MerkleLeaf.objects.bulk_create(
+            (
+                MerkleLeaf(batch=batch, document_id=doc_id, leaf_index=index, proof=proofs[index])
+                for index, (doc_id, _) in enumerate(pending)
+            ),
+            batch_size=1000,
+        )
+    return batch
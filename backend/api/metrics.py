@@ -0,0 +1,263 @@
+# api/metrics.py
+"""Per-route request metrics, exposed in the Prometheus text format.
+
+MetricsMiddleware records, for every request, its latency, the number and
+total time of SQL queries it ran, request body bytes and response bytes.
+Series are keyed by method and URL pattern (e.g.
+``api/documents/uploads/<upload_id>/``), so path parameters do not multiply
+them. metrics_view serves the lot at /metrics.
+
+Queries are counted by record_queries, an execute wrapper installed on
+every database connection as it opens (api.signals). It reports to the
+request's QueryRecorder through a context variable, which sync_to_async
+carries into worker threads, so async views are counted even though the
+ORM runs there on that thread's own connection.
+
+Requests slower than METRICS_SLOW_REQUEST_SECONDS are logged to the
+"api.slow_requests" logger together with their SQL, which is how an N+1
+shows up: one request, dozens of near-identical statements.
+
+Counters are per process; scrape each worker.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger("api.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SLOW_LOG_MAX_STATEMENTS = 50
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.statuses = defaultdict(int)
+        self.query_seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._routes = defaultdict(RouteStats)
+        self._lock = threading.Lock()
+
+    def observe(self, method, route, status, seconds, queries, query_seconds, request_bytes):
+        with self._lock:
+            stats = self._routes[(method, route)]
+            stats.latency.observe(seconds)
+            stats.queries.observe(queries)
+            stats.statuses[status] += 1
+            stats.query_seconds += query_seconds
+            stats.request_bytes += request_bytes
+
+    def add_response_bytes(self, method, route, size):
+        with self._lock:
+            self._routes[(method, route)].response_bytes += size
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def snapshot(self, method, route):
+        with self._lock:
+            return self._routes.get((method, route))
+
+    def render(self) -> str:
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, labels, hist):
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        with self._lock:
+            routes = sorted(self._routes.items())
+            series = [(_labels(method, route), stats) for (method, route), stats in routes]
+
+            family("api_requests_total", "counter", "Requests by route and status.")
+            for labels, stats in series:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'api_requests_total{{{labels},status="{status}"}} {count}')
+            family("api_request_duration_seconds", "histogram", "Request latency by route.")
+            for labels, stats in series:
+                histogram("api_request_duration_seconds", labels, stats.latency)
+            family("api_db_queries_per_request", "histogram", "SQL queries per request by route.")
+            for labels, stats in series:
+                histogram("api_db_queries_per_request", labels, stats.queries)
+            family("api_db_query_seconds_total", "counter", "Time spent in SQL by route.")
+            for labels, stats in series:
+                lines.append(f"api_db_query_seconds_total{{{labels}}} {stats.query_seconds:.6f}")
+            family("api_request_bytes_total", "counter", "Request body bytes by route.")
+            for labels, stats in series:
+                lines.append(f"api_request_bytes_total{{{labels}}} {stats.request_bytes}")
+            family("api_response_bytes_total", "counter", "Response body bytes by route.")
+            for labels, stats in series:
+                lines.append(f"api_response_bytes_total{{{labels}}} {stats.response_bytes}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(method, route):
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",route="{route}"'
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """execute_wrapper that counts and times queries, keeping SQL if asked."""
+
+    def __init__(self, keep_sql: bool):
+        self.keep_sql = keep_sql
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if self.keep_sql and len(self.statements) < SLOW_LOG_MAX_STATEMENTS:
+                self.statements.append((elapsed, sql))
+
+
+_current_recorder = contextvars.ContextVar("metrics_query_recorder", default=None)
+
+
+def record_queries(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_seconds = getattr(settings, "METRICS_SLOW_REQUEST_SECONDS", None)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder(keep_sql=self.slow_seconds is not None)
+        token = _current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self._record(request, response, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        # sync_to_async copies the context, so ORM calls on worker threads
+        # report to this recorder too.
+        recorder = QueryRecorder(keep_sql=self.slow_seconds is not None)
+        token = _current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self._record(request, response, recorder, time.perf_counter() - started)
+
+    def _record(self, request, response, recorder, seconds):
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match else "<unmatched>"
+        method = request.method
+        try:
+            request_bytes = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            request_bytes = 0
+        registry.observe(
+            method, route, response.status_code, seconds,
+            recorder.count, recorder.seconds, request_bytes,
+        )
+        if isinstance(response, FileResponse) and response.has_header("Content-Length"):
+            # The WSGI server may send the file itself (wsgi.file_wrapper),
+            # never iterating streaming_content.
+            registry.add_response_bytes(method, route, int(response["Content-Length"]))
+        elif response.streaming:
+            count = _acounted if response.is_async else _counted
+            response.streaming_content = count(response.streaming_content, method, route)
+        else:
+            registry.add_response_bytes(method, route, len(response.content))
+
+        if self.slow_seconds is not None and seconds >= self.slow_seconds:
+            logger.warning(
+                "Slow request %s %s (%s): %.3fs, %d queries in %.3fs\n%s",
+                method, request.path, route, seconds, recorder.count, recorder.seconds,
+                "\n".join(f"  [{elapsed * 1000:.1f}ms] {sql}" for elapsed, sql in recorder.statements),
+            )
+        return response
+
+
+def _counted(chunks, method, route):
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        registry.add_response_bytes(method, route, size)
+
+
+async def _acounted(chunks, method, route):
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        registry.add_response_bytes(method, route, size)
+
+
+def metrics_view(request):
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4")
@@ -0,0 +1,71 @@
+from django.db import migrations, models
+
+
+def in_pages(queryset, size=50):
+    """Yield rows a page at a time, keyed on pk.
+
+    QuerySet.iterator() does not stream on MySQL (mysqlclient buffers the
+    whole result), which would hold every document's bytes at once.
+    """
+    last = None
+    while True:
+        page = queryset.order_by("pk")
+        if last is not None:
+            page = page.filter(pk__gt=last)
+        page = list(page[:size])
+        if not page:
+            return
+        yield from page
+        last = page[-1].pk
+
+
+def move_data_to_blob_store(apps, schema_editor):
+    from api.blob_store import get_blob_store
+
+    Document = apps.get_model("api", "Document")
+    store = get_blob_store()
+    docs = Document.objects.only("pk", "content_hash", "document_data")
+    for doc in in_pages(docs):
+        data = bytes(doc.document_data or b"")
+        content_hash, size = store.save(data)
+        if content_hash != doc.content_hash:
+            # Legacy rows were hashed from these bytes; keep the column honest.
+            doc.content_hash = content_hash
+        doc.size = size
+        doc.save(update_fields=["content_hash", "size"])
+
+
+def move_data_to_database(apps, schema_editor):
+    from api.blob_store import get_blob_store
+
+    Document = apps.get_model("api", "Document")
+    store = get_blob_store()
+    for doc in in_pages(Document.objects.only("pk", "content_hash")):
+        with store.open(doc.content_hash) as fh:
+            doc.document_data = fh.read()
+        doc.save(update_fields=["document_data"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_personalinfo_dob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='size',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='document_data',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.RunPython(move_data_to_blob_store, move_data_to_database),
+        migrations.RemoveField(
+            model_name='document',
+            name='document_data',
+        ),
+    ]
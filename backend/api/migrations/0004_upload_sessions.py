@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:19
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_document_blob_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('document_name', models.CharField(max_length=255)),
+                ('document_type', models.CharField(max_length=50)),
+                ('expected_hash', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('empid', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='api.employee')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UploadPart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('part_number', models.PositiveIntegerField()),
+                ('size', models.BigIntegerField()),
+                ('part_hash', models.CharField(max_length=64)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parts', to='api.uploadsession')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('session', 'part_number'), name='uniq_upload_part')],
+            },
+        ),
+    ]
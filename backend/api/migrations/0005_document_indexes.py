@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['empid', '-uploaded_at'], name='document_emp_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['document_hash'], name='document_hash_idx'),
+        ),
+    ]
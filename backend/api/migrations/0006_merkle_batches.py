@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_document_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MerkleBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('root', models.CharField(db_index=True, max_length=64)),
+                ('leaf_count', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MerkleLeaf',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leaf_index', models.PositiveIntegerField()),
+                ('proof', models.JSONField()),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaves', to='api.merklebatch')),
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='merkle_leaf', to='api.document')),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_merkle_batches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_id', models.BigIntegerField()),
+                ('entry_hash', models.CharField(max_length=64)),
+                ('checked_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(max_length=32)),
+                ('empid', models.CharField(max_length=10)),
+                ('payload', models.JSONField()),
+                ('prev_hash', models.CharField(max_length=64, unique=True)),
+                ('entry_hash', models.CharField(max_length=64, unique=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='employee',
+            name='password_hash',
+            field=models.CharField(max_length=255),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:25
+
+from django.db import migrations, models
+
+
+def create_sequence(apps, schema_editor):
+    EmpidSequence = apps.get_model('api', 'EmpidSequence')
+    EmpidSequence.objects.get_or_create(name='empid', defaults={'next_value': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_widen_password_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmpidSequence',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(create_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:31
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicate_rows(apps, schema_editor):
+    # The API always showed the lowest-pk row per employee; keep that one.
+    for name in ('PersonalInfo', 'ContactInfo', 'EmploymentInfo'):
+        model = apps.get_model('api', name)
+        keep = model.objects.values('empid').annotate(first=Min('pk')).values_list('first', flat=True)
+        model.objects.exclude(pk__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_empid_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='contactinfo',
+            constraint=models.UniqueConstraint(fields=('empid',), name='contactinfo_empid_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='employmentinfo',
+            constraint=models.UniqueConstraint(fields=('empid',), name='employmentinfo_empid_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='personalinfo',
+            constraint=models.UniqueConstraint(fields=('empid',), name='personalinfo_empid_unique'),
+        ),
+    ]
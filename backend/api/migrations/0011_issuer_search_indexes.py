@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_one_profile_row_per_employee'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employmentinfo',
+            index=models.Index(fields=['department', 'empid'], name='employment_dept_emp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employmentinfo',
+            index=models.Index(fields=['job_designation', 'empid'], name='employment_desig_emp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personalinfo',
+            index=models.Index(fields=['lastname', 'empid'], name='personal_last_emp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personalinfo',
+            index=models.Index(fields=['firstname', 'empid'], name='personal_first_emp_idx'),
+        ),
+    ]
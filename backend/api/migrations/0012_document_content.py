@@ -0,0 +1,65 @@
+from django.db import migrations, models
+from django.db.models import Count, Max
+import django.db.models.deletion
+
+
+def create_contents(apps, schema_editor):
+    Document = apps.get_model('api', 'Document')
+    DocumentContent = apps.get_model('api', 'DocumentContent')
+    rows = (
+        Document.objects.values('content_hash')
+        .annotate(refs=Count('id'), max_size=Max('size'))
+        .order_by()
+    )
+    DocumentContent.objects.bulk_create(
+        [
+            DocumentContent(content_hash=row['content_hash'], size=row['max_size'], ref_count=row['refs'])
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+def restore_sizes(apps, schema_editor):
+    Document = apps.get_model('api', 'Document')
+    DocumentContent = apps.get_model('api', 'DocumentContent')
+    for content in DocumentContent.objects.iterator():
+        Document.objects.filter(content_hash=content.content_hash).update(size=content.size)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_issuer_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentContent',
+            fields=[
+                ('content_hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(create_contents, restore_sizes),
+        migrations.RemoveField(
+            model_name='document',
+            name='size',
+        ),
+        # Same column, now a foreign key to the content row.
+        migrations.AlterField(
+            model_name='document',
+            name='content_hash',
+            field=models.ForeignKey(
+                db_column='content_hash', on_delete=django.db.models.deletion.PROTECT,
+                related_name='documents', to='api.documentcontent',
+            ),
+        ),
+        migrations.RenameField(
+            model_name='document',
+            old_name='content_hash',
+            new_name='content',
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_document_content'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ledgerentry',
+            name='empid',
+            field=models.CharField(db_collation='utf8mb4_general_ci', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['empid', 'id'], name='ledger_emp_id_idx'),
+        ),
+    ]
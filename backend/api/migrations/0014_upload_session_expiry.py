@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_ledger_emp_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:17
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_upload_session_expiry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeImport',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('format', models.CharField(max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='pending', max_length=10)),
+                ('report', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='import_status_created_idx')],
+            },
+        ),
+    ]
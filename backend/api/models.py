@@ -1,11 +1,13 @@
 # api/models.py
+import uuid
+
 from django.db import models
 from django.core.validators import RegexValidator, EmailValidator
 
 class Employee(models.Model):
     empid = models.CharField(max_length=10, primary_key=True, unique=True, db_collation="utf8mb4_general_ci")
     email = models.EmailField(max_length=100, unique=True)
-    password_hash = models.CharField(max_length=64)  # SHA-256 hex
+    password_hash = models.CharField(max_length=255)  # see api.passwords for the format
     user_hash = models.CharField(max_length=64, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -19,6 +21,15 @@ class PersonalInfo(models.Model):
     lastname = models.CharField(max_length=50, validators=[RegexValidator(r'^[A-Za-z ]+$', "Only letters and spaces allowed")])
     dob = models.DateField(null=True, blank=True)
 
+    class Meta:
+        # One row per employee, so profile writes can upsert on empid.
+        constraints = [models.UniqueConstraint(fields=["empid"], name="personalinfo_empid_unique")]
+        indexes = [
+            # Issuer name search: prefix range, then keyset order on (name, empid).
+            models.Index(fields=["lastname", "empid"], name="personal_last_emp_idx"),
+            models.Index(fields=["firstname", "empid"], name="personal_first_emp_idx"),
+        ]
+
     def __str__(self):
         return f"{self.firstname} {self.lastname} ({self.empid_id})"
 
@@ -29,6 +40,10 @@ class ContactInfo(models.Model):
     email = models.EmailField(max_length=100, validators=[EmailValidator()])
     address = models.TextField()
 
+    class Meta:
+        # One row per employee, so profile writes can upsert on empid.
+        constraints = [models.UniqueConstraint(fields=["empid"], name="contactinfo_empid_unique")]
+
     def __str__(self):
         return f"Contact for {self.empid_id} - {self.mobile}"
 
@@ -38,18 +53,152 @@ class EmploymentInfo(models.Model):
     job_designation = models.CharField(max_length=100)
     department = models.CharField(max_length=100)
 
+    class Meta:
+        # One row per employee, so profile writes can upsert on empid.
+        constraints = [models.UniqueConstraint(fields=["empid"], name="employmentinfo_empid_unique")]
+        indexes = [
+            # Issuer listing: filter, then keyset order on empid.
+            models.Index(fields=["department", "empid"], name="employment_dept_emp_idx"),
+            models.Index(fields=["job_designation", "empid"], name="employment_desig_emp_idx"),
+        ]
+
     def __str__(self):
         return f"{self.empid_id} - {self.job_designation}"
 
 
+class DocumentContent(models.Model):
+    """One row per distinct file; the bytes live in the blob store under content_hash."""
+    content_hash = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)  # Documents pointing here
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.content_hash} ({self.ref_count} refs)"
+
+
 class Document(models.Model):
     empid = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="documents")
     document_name = models.CharField(max_length=255)
     document_type = models.CharField(max_length=50)
     document_hash = models.CharField(max_length=64)
-    content_hash = models.CharField(max_length=64)
+    content = models.ForeignKey(
+        DocumentContent, on_delete=models.PROTECT, related_name="documents", db_column="content_hash"
+    )
     uploaded_at = models.DateTimeField(auto_now_add=True)
-    document_data = models.BinaryField()
+
+    class Meta:
+        indexes = [
+            # Serves "latest document for an employee" without a filesort.
+            models.Index(fields=["empid", "-uploaded_at"], name="document_emp_uploaded_idx"),
+            models.Index(fields=["document_hash"], name="document_hash_idx"),
+        ]
 
     def __str__(self):
         return f"{self.document_name} ({self.empid_id})"
+
+
+class UploadSession(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    empid = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="upload_sessions")
+    document_name = models.CharField(max_length=255)
+    document_type = models.CharField(max_length=50)
+    expected_hash = models.CharField(max_length=64, blank=True)  # optional client-declared SHA-256
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # expiry: UPLOAD_SESSION_TTL
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.empid_id})"
+
+
+class UploadPart(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name="parts")
+    part_number = models.PositiveIntegerField()
+    size = models.BigIntegerField()
+    part_hash = models.CharField(max_length=64)  # SHA-256 of this part only
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["session", "part_number"], name="uniq_upload_part"),
+        ]
+
+    def __str__(self):
+        return f"Part {self.part_number} of {self.session_id}"
+
+
+class MerkleBatch(models.Model):
+    root = models.CharField(max_length=64, db_index=True)
+    leaf_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Batch {self.pk} ({self.leaf_count} leaves) {self.root}"
+
+
+class MerkleLeaf(models.Model):
+    batch = models.ForeignKey(MerkleBatch, on_delete=models.CASCADE, related_name="leaves")
+    document = models.OneToOneField(Document, on_delete=models.CASCADE, related_name="merkle_leaf")
+    leaf_index = models.PositiveIntegerField()
+    proof = models.JSONField()  # [["L" | "R", sibling_hash], ...] from leaf to root
+
+    def __str__(self):
+        return f"Leaf {self.leaf_index} of batch {self.batch_id}"
+
+
+class LedgerEntry(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    event_type = models.CharField(max_length=32)
+    # Not a FK: history outlives the employee row. Same collation as
+    # Employee.empid, so ledger_version()'s correlated lookup compares like
+    # with like and can use ledger_emp_id_idx.
+    empid = models.CharField(max_length=10, db_collation="utf8mb4_general_ci")
+    payload = models.JSONField()
+    prev_hash = models.CharField(max_length=64, unique=True)  # one successor per entry
+    entry_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # An employee's newest entry is their profile version (api.profiles.ledger_version).
+            models.Index(fields=["empid", "id"], name="ledger_emp_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.event_type} ({self.empid})"
+
+
+class LedgerCheckpoint(models.Model):
+    entry_id = models.BigIntegerField()
+    entry_hash = models.CharField(max_length=64)
+    checked_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Audited through #{self.entry_id}"
+
+
+class EmpidSequence(models.Model):
+    name = models.CharField(max_length=32, primary_key=True)
+    next_value = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name} -> {self.next_value}"
+
+
+class EmployeeImport(models.Model):
+    """A queued bulk import; run_employee_imports works through pending rows."""
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+    STATUSES = [(s, s) for s in (PENDING, RUNNING, DONE, FAILED)]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255)
+    format = models.CharField(max_length=10)  # "csv" or "ndjson"
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    report = models.JSONField(null=True, blank=True)  # ImportReport.as_dict() once done
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"], name="import_status_created_idx")]
+
+    def __str__(self):
+        return f"Import {self.id} ({self.status})"
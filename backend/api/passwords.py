@@ -0,0 +1,176 @@
+# api/passwords.py
+"""Password hashing on a bounded worker pool.
+
+Hashes are stored as ``algorithm$params...$salt$hash``:
+
+    scrypt$<n>$<r>$<p>$<salt>$<hash>
+    pbkdf2_sha256$<iterations>$<salt>$<hash>
+
+Bare 64-character hex strings are legacy unsalted SHA-256 hashes; they
+still verify, and needs_rehash() flags them so login can upgrade them.
+
+The KDFs release the GIL, so a thread pool gives real parallelism. A
+semaphore bounds the work in flight; when it stays full for longer than
+the configured timeout, callers get PasswordHasherBusy instead of piling
+up behind the pool.
+
+Bulk imports hash on a second pool (get_import_hasher()), so a large
+import queues behind itself rather than filling the slots logins wait on.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+
+LEGACY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+DEFAULTS = {
+    "algorithm": "scrypt",
+    "n": 2 ** 14,
+    "r": 8,
+    "p": 1,
+    "iterations": 600000,
+    "executor": "thread",
+    "workers": 4,
+    "max_pending": 32,
+    "timeout": 5.0,
+}
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode()
+
+
+def _derive(algorithm: str, params: tuple, password: str, salt: bytes) -> bytes:
+    if algorithm == "scrypt":
+        n, r, p = params
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024, dklen=32
+        )
+    if algorithm == "pbkdf2_sha256":
+        (iterations,) = params
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    raise ValueError(f"Unknown password algorithm: {algorithm}")
+
+
+def _encode(algorithm: str, params: tuple, password: str) -> str:
+    salt = os.urandom(16)
+    derived = _derive(algorithm, params, password, salt)
+    return "$".join([algorithm, *map(str, params), _b64(salt), _b64(derived)])
+
+
+PARAM_COUNTS = {"scrypt": 3, "pbkdf2_sha256": 1}
+
+
+def is_encoded(value) -> bool:
+    """True if value is a hash _verify() understands (a KDF string or legacy SHA-256)."""
+    if not isinstance(value, str):
+        return False
+    if LEGACY_RE.match(value):
+        return True
+    algorithm, *rest = value.split("$")
+    if PARAM_COUNTS.get(algorithm) != len(rest) - 2:
+        return False
+    *params, salt, derived = rest
+    try:
+        [int(v) for v in params]
+        base64.b64decode(salt, validate=True)
+        base64.b64decode(derived, validate=True)
+    except ValueError:
+        return False
+    return bool(salt and derived)
+
+
+def _verify(password: str, encoded: str) -> bool:
+    if LEGACY_RE.match(encoded):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, encoded)
+    if encoded.count("$") < 3:
+        return False  # unusable password, e.g. "!"
+    algorithm, *params, salt, expected = encoded.split("$")
+    derived = _derive(algorithm, tuple(int(v) for v in params), password, base64.b64decode(salt))
+    return hmac.compare_digest(_b64(derived), expected)
+
+
+class PasswordHasher:
+    def __init__(self, **config):
+        config = {**DEFAULTS, **config}
+        self.algorithm = config["algorithm"]
+        if self.algorithm == "scrypt":
+            self.params = (config["n"], config["r"], config["p"])
+        else:
+            self.params = (config["iterations"],)
+        self.timeout = config["timeout"]
+        executor_class = ProcessPoolExecutor if config["executor"] == "process" else ThreadPoolExecutor
+        self._executor = executor_class(max_workers=config["workers"])
+        self._slots = threading.BoundedSemaphore(config["workers"] + config["max_pending"])
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy("Too many password hashes in flight")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def encode(self, password: str) -> str:
+        return self._run(_encode, self.algorithm, self.params, password).result()
+
+    def encode_many(self, passwords):
+        """Hash several passwords in parallel, preserving order."""
+        futures = [self._run(_encode, self.algorithm, self.params, pw) for pw in passwords]
+        return [future.result() for future in futures]
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return self._run(_verify, password, encoded).result()
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return not encoded.startswith("$".join([self.algorithm, *map(str, self.params)]) + "$")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher(**getattr(settings, "PASSWORD_KDF", {}))
+    return _hasher
+
+
+_import_hasher = None
+
+
+def get_import_hasher() -> PasswordHasher:
+    """Hasher for bulk imports: PASSWORD_KDF with PASSWORD_KDF_IMPORT's pool settings."""
+    global _import_hasher
+    if _import_hasher is None:
+        with _hasher_lock:
+            if _import_hasher is None:
+                _import_hasher = PasswordHasher(**{
+                    **getattr(settings, "PASSWORD_KDF", {}),
+                    **getattr(settings, "PASSWORD_KDF_IMPORT", {}),
+                })
+    return _import_hasher
+
+
+def hash_password(password: str) -> str:
+    return get_hasher().encode(password)
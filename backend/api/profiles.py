@@ -0,0 +1,210 @@
+# api/profiles.py
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, router
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.http import quote_etag
+
+from .caching import LRUCache
+from .db_router import pinned_to_primary
+from .models import Employee, PersonalInfo, ContactInfo, EmploymentInfo, Document, LedgerEntry
+
+
+def first_related(model, field: str, order_by: str = "pk"):
+    rows = model.objects.filter(empid=OuterRef("pk")).order_by(order_by)
+    return Subquery(rows.values(field)[:1])
+
+
+def with_profile(qs=None):
+    """Annotate employees with every profile field so a profile is one query."""
+    if qs is None:
+        qs = Employee.objects.all()
+    return qs.annotate(
+        p_firstname=first_related(PersonalInfo, "firstname"),
+        p_lastname=first_related(PersonalInfo, "lastname"),
+        p_dob=first_related(PersonalInfo, "dob"),
+        c_mobile=first_related(ContactInfo, "mobile"),
+        c_address=first_related(ContactInfo, "address"),
+        e_job_designation=first_related(EmploymentInfo, "job_designation"),
+        e_department=first_related(EmploymentInfo, "department"),
+        latest_document_hash=first_related(Document, "document_hash", "-uploaded_at"),
+    )
+
+
+def serialize_profile(emp: Employee):
+    """Build the profile dict from an employee loaded through with_profile()."""
+    return {
+        "firstName": emp.p_firstname or "",
+        "lastName": emp.p_lastname or "",
+        "dateOfBirth": emp.p_dob.isoformat() if emp.p_dob else "",
+        "mobile": emp.c_mobile or "",
+        "email": emp.email,
+        "address": emp.c_address or "",
+        "jobDesignation": emp.e_job_designation or "",
+        "department": emp.e_department or "",
+        "employeeId": emp.empid,
+        "userHash": emp.user_hash,
+        "documentHash": emp.latest_document_hash,
+    }
+
+
+def profile_etag(empid: str, version: int) -> str:
+    return quote_etag(f"{empid}.{version}")
+
+
+# empid -> (profile version, serialize_profile() dict), so /me/ and /profile/
+# polls skip the with_profile() query. Writes forget the entry once they
+# commit, but only in their own process: other workers keep theirs for at
+# most PROFILE_CACHE_TTL seconds.
+_profile_cache = LRUCache(
+    maxsize=getattr(settings, "PROFILE_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "PROFILE_CACHE_TTL", 5),
+)
+# empid -> generation of its latest forget_profiles(); a load that started
+# before it may have read the old profile and is not cached.
+_forgotten = LRUCache(maxsize=getattr(settings, "PROFILE_CACHE_SIZE", 10000), ttl=60)
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def profile_cache_generation() -> int:
+    """Call before loading a profile; pass the result to cache_profile()."""
+    with _generation_lock:
+        return _generation
+
+
+def cached_profile(empid: str):
+    """Return (version, profile) for empid, or None.
+
+    Requests pinned to the primary (they wrote, or just did) skip the cache
+    so they read their own writes.
+    """
+    if pinned_to_primary():
+        return None
+    return _profile_cache.get(empid)
+
+
+def cache_profile(empid: str, version: int, profile: dict, started: int):
+    # Replica reads may lag a write whose forget has already run.
+    if router.db_for_read(Employee) != DEFAULT_DB_ALIAS:
+        return
+    with _generation_lock:
+        if _forgotten.get(empid, -1) > started:
+            return
+        _profile_cache.set(empid, (version, profile))
+
+
+def forget_profiles(*empids):
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        for empid in empids:
+            _forgotten.set(empid, _generation)
+            _profile_cache.delete(empid)
+
+
+def clear_profile_cache():
+    _profile_cache.clear()
+    _forgotten.clear()
+
+
+class EmailTaken(Exception):
+    """Another account already has the requested email."""
+
+
+def ledger_version():
+    """Annotation: id of the employee's newest ledger entry, or 0.
+
+    Every write that changes a profile (profile updates, document uploads
+    and deletes) appends a ledger entry in the same transaction, so this is
+    a profile version that costs no extra write.
+    """
+    rows = LedgerEntry.objects.filter(empid=OuterRef("pk")).order_by("-id").values("id")[:1]
+    return Coalesce(Subquery(rows), 0)
+
+
+# Profile key -> (table, column, with_profile() annotation). Contact rows
+# also mirror the employee's email.
+PROFILE_FIELDS = {
+    "firstName": (PersonalInfo, "firstname", "p_firstname"),
+    "lastName": (PersonalInfo, "lastname", "p_lastname"),
+    "dateOfBirth": (PersonalInfo, "dob", "p_dob"),
+    "mobile": (ContactInfo, "mobile", "c_mobile"),
+    "address": (ContactInfo, "address", "c_address"),
+    "jobDesignation": (EmploymentInfo, "job_designation", "e_job_designation"),
+    "department": (EmploymentInfo, "department", "e_department"),
+}
+
+
+def diff_profile(emp: Employee, values: dict):
+    """Return the subset of values that differ from emp, as loaded by with_profile()."""
+    changed = {}
+    for key, value in values.items():
+        if key == "email":
+            current = emp.email
+        elif key in PROFILE_FIELDS:
+            current = getattr(emp, PROFILE_FIELDS[key][2])
+        else:
+            continue
+        if value != current:
+            changed[key] = value
+    return changed
+
+
+def _upsert(model, instance, fields):
+    features = connections[router.db_for_write(model)].features
+    if features.supports_update_conflicts:
+        # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target.
+        unique_fields = ["empid"] if features.supports_update_conflicts_with_target else None
+        model.objects.bulk_create(
+            [instance], update_conflicts=True, unique_fields=unique_fields, update_fields=fields
+        )
+    elif not model.objects.filter(empid=instance.empid_id).update(
+        **{f: getattr(instance, f) for f in fields}
+    ):
+        instance.save(force_insert=True)
+
+
+def save_profile_changes(emp: Employee, changed: dict):
+    """Write changed values, one statement per touched table, and update emp to match.
+
+    Touched tables are employee (email), personal, contact (also for email)
+    and employment, so at most four statements. Call inside
+    transaction.atomic(). Afterwards serialize_profile(emp) reflects the new
+    state without re-reading it.
+
+    Raises EmailTaken if the email is claimed concurrently; it is the first
+    statement, so nothing else has been written and the caller's atomic
+    block rolls back.
+    """
+    if "email" in changed:
+        try:
+            Employee.objects.filter(pk=emp.pk).update(email=changed["email"])
+        except IntegrityError as exc:
+            raise EmailTaken(changed["email"]) from exc
+        emp.email = changed["email"]
+
+    touched = {}
+    for key, value in changed.items():
+        if key in PROFILE_FIELDS:
+            model, column, annotation = PROFILE_FIELDS[key]
+            touched.setdefault(model, []).append(column)
+            setattr(emp, annotation, value)
+    if "email" in changed:
+        touched.setdefault(ContactInfo, []).append("email")
+
+    for model, columns in touched.items():
+        row = {
+            column: getattr(emp, annotation)
+            for m, column, annotation in PROFILE_FIELDS.values() if m is model
+        }
+        if model is ContactInfo:
+            row["email"] = emp.email
+        # A missing row is inserted with blanks, matching what the API reports for it.
+        instance = model(empid_id=emp.pk, **{
+            column: "" if value is None and column != "dob" else value
+            for column, value in row.items()
+        })
+        _upsert(model, instance, columns)
@@ -0,0 +1,18 @@
+# api/signals.py
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .documents import release_content_reference
+from .metrics import install_query_recorder
+from .models import Document
+
+
+@receiver(post_delete, sender=Document)
+def release_document_content(sender, instance, **kwargs):
+    # Covers every delete path: the API, the admin and cascades from Employee.
+    release_content_reference(instance.content_id)
+
+
+# Per-request SQL counts for api.metrics, on every alias and thread.
+connection_created.connect(install_query_recorder, dispatch_uid="api.metrics.install_query_recorder")
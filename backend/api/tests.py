@@ -1,3 +1,1387 @@
-from django.test import TestCase
+import datetime
+import decimal
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import MemoryFileUploadHandler
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections
+from django.db.models import BooleanField, Value
+from django.http import FileResponse
+from django.test import AsyncClient, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import bulk_import, db_router, ledger, merkle, metrics, passwords, profiles, renderers
+from .api import documents_with_hash
+from . import auth_utils
+from .auth_utils import create_jwt, sha256_hex
+from .blob_store import BlobTooLarge, FileSystemBlobStore
+from .db_router import PrimaryReplicaRouter, RoutingState
+from .documents import add_content_reference
+from .empids import EmpidAllocator
+from .throttling import RateLimiter, get_rate_limiter
+from .verify_cache import VerificationCache, get_verification_cache
+from .models import (
+    Employee, PersonalInfo, ContactInfo, EmploymentInfo, Document, DocumentContent, LedgerEntry,
+    EmployeeImport, MerkleBatch, MerkleLeaf, UploadPart, UploadSession,
+)
+
+
+def make_employee(empid="emp1000001", email="jane@example.com", password="password123"):
+    return Employee.objects.create(
+        empid=empid,
+        email=email,
+        password_hash=sha256_hex(password),
+        user_hash=sha256_hex(email),
+    )
+
+
+def make_document(emp, content_hash, name="cert.pdf", size=1):
+    add_content_reference(content_hash, size)
+    return Document.objects.create(
+        empid=emp, document_name=name, document_type="application/pdf",
+        document_hash=content_hash, content_id=content_hash,
+    )
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        # Auth caches are per process and would leak between tests.
+        auth_utils.clear_auth_caches()
+        profiles.clear_profile_cache()
+        get_verification_cache().clear()
+        get_rate_limiter().clear()
+
+
+def auth_header(emp):
+    return {"HTTP_AUTHORIZATION": f"Bearer {create_jwt(emp.empid)}"}
+
+
+class ProfileQueryTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.emp = make_employee()
+        PersonalInfo.objects.create(empid=self.emp, firstname="Jane", lastname="Doe")
+        ContactInfo.objects.create(
+            empid=self.emp, mobile="12345", email=self.emp.email, address="1 Main St"
+        )
+        EmploymentInfo.objects.create(
+            empid=self.emp, job_designation="Engineer", department="R&D"
+        )
+        make_document(self.emp, "a" * 64, name="offer.pdf", size=5)
+
+    def test_me_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            res = self.client.get("/api/me/", **auth_header(self.emp))
+        self.assertEqual(res.status_code, 200)
+        profile = res.json()["profile"]
+        self.assertEqual(profile["firstName"], "Jane")
+        self.assertEqual(profile["mobile"], "12345")
+        self.assertEqual(profile["department"], "R&D")
+        self.assertEqual(profile["documentHash"], "a" * 64)
+
+    def test_profile_without_related_rows(self):
+        emp = make_employee(empid="emp1000002", email="john@example.com")
+        res = self.client.get("/api/profile/", **auth_header(emp))
+        profile = res.json()["profile"]
+        self.assertEqual(profile["firstName"], "")
+        self.assertEqual(profile["dateOfBirth"], "")
+        self.assertIsNone(profile["documentHash"])
+
+
+class BlobStoreTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.blob_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.blob_root, ignore_errors=True)
+        overrides = override_settings(BLOB_STORE_OPTIONS={"root": self.blob_root})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.store = FileSystemBlobStore(self.blob_root)
+
+
+class BlobStoreTests(BlobStoreTestCase):
+    def test_save_is_content_addressed_and_sharded(self):
+        content_hash, size = self.store.save(b"hello")
+        self.assertEqual(content_hash, hashlib.sha256(b"hello").hexdigest())
+        self.assertEqual(size, 5)
+        path = self.store.path(content_hash)
+        self.assertEqual(path.parent.name, content_hash[2:4])
+        self.assertEqual(path.parent.parent.name, content_hash[:2])
+        with self.store.open(content_hash) as fh:
+            self.assertEqual(fh.read(), b"hello")
+
+    def test_save_stream_hashes_incrementally(self):
+        chunks = [b"abc", b"def", b"ghi"]
+        content_hash, size = self.store.save_stream(iter(chunks))
+        self.assertEqual(content_hash, hashlib.sha256(b"abcdefghi").hexdigest())
+        self.assertEqual(size, 9)
+
+    def test_save_stream_aborts_over_max_size(self):
+        def chunks():
+            yield b"x" * 8
+            self.fail("stream should stop at the first oversized chunk")
+
+        with self.assertRaises(BlobTooLarge):
+            self.store.save_stream(chunks(), max_size=4)
+        self.assertEqual(list((self.store.root / "tmp").iterdir()), [])
+
+    def test_store_inside_media_root_fails_the_system_check(self):
+        from .checks import blob_store_not_public
+
+        self.assertEqual(blob_store_not_public(None), [])
+        with override_settings(MEDIA_ROOT=self.blob_root):
+            self.assertEqual([e.id for e in blob_store_not_public(None)], ["api.E001"])
+        with override_settings(MEDIA_ROOT=self.blob_root + "-media"):
+            self.assertEqual(blob_store_not_public(None), [])
+
+    def test_rejects_non_hash_keys(self):
+        with self.assertRaises(ValueError):
+            self.store.path("../../etc/passwd")
+
+    def test_upload_keeps_only_hash_and_size_on_the_row(self):
+        emp = make_employee()
+        upload = SimpleUploadedFile("cert.pdf", b"certificate", content_type="application/pdf")
+        res = self.client.post("/api/documents/", {"file": upload}, **auth_header(emp))
+        self.assertTrue(res.json()["ok"])
+        doc = Document.objects.get(empid=emp)
+        self.assertEqual(doc.content.size, len(b"certificate"))
+        self.assertTrue(self.store.exists(doc.content_id))
+
+    @override_settings(DOCUMENT_MAX_UPLOAD_BYTES=4)
+    def test_upload_over_limit_is_rejected(self):
+        emp = make_employee()
+        upload = SimpleUploadedFile("big.pdf", b"too large")
+        res = self.client.post("/api/documents/", {"file": upload}, **auth_header(emp))
+        self.assertEqual(res.status_code, 413)
+        self.assertFalse(Document.objects.exists())
+
+    @override_settings(DOCUMENT_MAX_UPLOAD_BYTES=100)
+    def test_oversized_bodies_are_stopped_before_django_buffers_them(self):
+        headers = auth_header(make_employee())
+        with mock.patch.object(MemoryFileUploadHandler, "receive_data_chunk") as buffered, \
+                mock.patch.object(MemoryFileUploadHandler, "new_file") as opened:
+            for url, size in [
+                ("/api/documents/", 5000), ("/api/async/documents/", 5000), ("/api/documents/", 200000),
+            ]:
+                upload = SimpleUploadedFile("big.pdf", b"x" * size)
+                self.assertEqual(self.client.post(url, {"file": upload}, **headers).status_code, 413)
+        buffered.assert_not_called()
+        # Past Content-Length plus MULTIPART_OVERHEAD, no part is even opened.
+        self.assertEqual(opened.call_count, 2)
+
+
+class ResumableUploadTests(BlobStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.emp = make_employee()
+        self.auth = auth_header(self.emp)
+
+    def create_session(self, **extra):
+        body = {"fileName": "scan.pdf", "contentType": "application/pdf", **extra}
+        res = self.client.post(
+            "/api/documents/uploads/", body, content_type="application/json", **self.auth
+        )
+        return res.json()["uploadId"]
+
+    def put_part(self, upload_id, number, data, **headers):
+        return self.client.put(
+            f"/api/documents/uploads/{upload_id}/parts/{number}/",
+            data,
+            content_type="application/octet-stream",
+            **self.auth,
+            **headers,
+        )
+
+    def commit(self, upload_id, **body):
+        return self.client.post(
+            f"/api/documents/uploads/{upload_id}/commit/",
+            body,
+            content_type="application/json",
+            **self.auth,
+        ).json()
+
+    def test_parts_in_any_order_commit_to_one_document(self):
+        whole = b"part-one|part-two|part-three"
+        upload_id = self.create_session(sha256=hashlib.sha256(whole).hexdigest())
+        self.put_part(upload_id, 3, b"part-three")
+        self.put_part(upload_id, 1, b"part-one|")
+        res = self.put_part(upload_id, 2, b"part-two|")
+        self.assertEqual(res.json()["sha256"], hashlib.sha256(b"part-two|").hexdigest())
+
+        result = self.commit(upload_id)
+        self.assertTrue(result["ok"])
+        doc = Document.objects.get(empid=self.emp)
+        self.assertEqual(doc.content_id, hashlib.sha256(whole).hexdigest())
+        self.assertEqual(doc.content.size, len(whole))
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_missing_parts_are_reported(self):
+        upload_id = self.create_session()
+        self.put_part(upload_id, 1, b"a")
+        self.put_part(upload_id, 3, b"c")
+        result = self.commit(upload_id)
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["missingParts"], [2])
+
+    def test_corrupt_part_can_be_retried(self):
+        upload_id = self.create_session()
+        res = self.put_part(upload_id, 1, b"garbled", HTTP_X_PART_SHA256="0" * 64)
+        self.assertEqual(res.status_code, 400)
+        self.put_part(upload_id, 1, b"good")
+        self.assertTrue(self.commit(upload_id, sha256=hashlib.sha256(b"good").hexdigest())["ok"])
+
+    def test_final_hash_mismatch_keeps_session(self):
+        upload_id = self.create_session(sha256="f" * 64)
+        self.put_part(upload_id, 1, b"data")
+        self.assertFalse(self.commit(upload_id)["ok"])
+        self.assertFalse(Document.objects.exists())
+        self.assertTrue(UploadSession.objects.filter(id=upload_id).exists())
+
+    @override_settings(DOCUMENT_MAX_UPLOAD_BYTES=10)
+    def test_the_size_limit_covers_the_whole_session(self):
+        upload_id = self.create_session()
+        self.assertEqual(self.put_part(upload_id, 1, b"x" * 6).status_code, 200)
+        self.assertEqual(self.put_part(upload_id, 2, b"x" * 6).status_code, 413)
+        self.assertEqual(self.put_part(upload_id, 1, b"x" * 8).status_code, 200)  # a retry replaces its bytes
+        self.assertEqual(self.put_part(upload_id, 2, b"x" * 2).status_code, 200)
+        self.assertEqual(self.put_part(upload_id, 3, b"x").status_code, 413)
+        self.assertEqual(
+            sorted(UploadPart.objects.filter(session_id=upload_id).values_list("part_number", "size")),
+            [(1, 8), (2, 2)],
+        )
+
+    @override_settings(UPLOAD_SESSION_TTL=60)
+    def test_expired_sessions_are_closed_and_pruned(self):
+        expired, live = self.create_session(), self.create_session()
+        self.put_part(expired, 1, b"old")
+        self.put_part(live, 1, b"new")
+        orphan = uuid.uuid4()
+        self.store.save_part(orphan, 1, [b"abandoned"])
+        UploadSession.objects.filter(id=expired).update(created_at=timezone.now() - datetime.timedelta(minutes=2))
+        self.assertEqual(self.put_part(expired, 2, b"more").status_code, 404)
+
+        out = io.StringIO()
+        call_command("prune_blobs", grace_seconds=-5, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual((report["expiredSessions"], report["uploadsDeleted"]), (1, 2))
+        self.assertEqual(report["bytesFreed"], len(b"old") + len(b"abandoned"))
+        self.assertEqual([u for u, _ in self.store.iter_uploads()], [live])
+        self.assertTrue(self.commit(live)["ok"])
+
+    def test_sessions_are_private_to_their_owner(self):
+        upload_id = self.create_session()
+        other = make_employee(empid="emp1000002", email="john@example.com")
+        res = self.client.put(
+            f"/api/documents/uploads/{upload_id}/parts/1/",
+            b"x",
+            content_type="application/octet-stream",
+            **auth_header(other),
+        )
+        self.assertEqual(res.status_code, 404)
+
+
+class BatchVerifyTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.hashes = {}
+        for n in range(1, 4):
+            emp = make_employee(empid=f"emp100000{n}", email=f"user{n}@example.com")
+            for version in ("old", "new"):
+                content_hash = hashlib.sha256(f"{n}-{version}".encode()).hexdigest()
+                make_document(emp, content_hash, name="cv.pdf")
+            self.hashes[emp.empid] = content_hash
+        self.items = [
+            {"employeeId": "emp1000001", "hash": self.hashes["emp1000001"]},
+            {"employeeId": "emp1000002", "hash": "0" * 64},
+            {"employeeId": "emp9999999", "hash": "0" * 64},
+            {"employeeId": "emp1000003", "hash": self.hashes["emp1000003"]},
+        ]
+
+    def test_batch_resolves_in_one_query(self):
+        with self.assertNumQueries(1):
+            res = self.client.post(
+                "/api/verify/batch/", {"items": self.items}, content_type="application/json"
+            )
+        body = res.json()
+        self.assertEqual(body["total"], 4)
+        self.assertEqual(body["matched"], 2)
+        self.assertEqual([r["ok"] for r in body["results"]], [True, False, False, True])
+        self.assertIn("No record found", body["results"][2]["error"])
+
+    def test_batch_matches_single_verify(self):
+        for item in self.items:
+            single = self.client.post("/api/verify/", item, content_type="application/json").json()
+            batch = self.client.post(
+                "/api/verify/batch/", {"items": [item]}, content_type="application/json"
+            ).json()["results"][0]
+            self.assertEqual({k: batch[k] for k in single}, single)
+
+    @override_settings(VERIFY_BATCH_CHUNK_SIZE=2)
+    def test_ndjson_streams_one_line_per_item(self):
+        res = self.client.post(
+            "/api/verify/batch/?format=ndjson", {"items": self.items}, content_type="application/json"
+        )
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["employeeId"] for line in lines],
+                         [item["employeeId"] for item in self.items])
+
+
+class DocumentIndexTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.emp = make_employee()
+        for n in range(20):
+            content_hash = hashlib.sha256(str(n).encode()).hexdigest()
+            make_document(self.emp, content_hash, name=f"doc{n}.pdf")
+        self.latest_hash = content_hash
+
+    def assertNoFullScan(self, queryset):
+        if connection.vendor == "mysql":
+            plan = queryset.explain(format="json")
+            self.assertNotIn('"access_type": "ALL"', plan)
+            self.assertNotIn('"using_filesort": true', plan)
+        elif connection.vendor == "sqlite":
+            plan = queryset.explain()
+            self.assertNotIn("SCAN api_document", plan)
+            self.assertIn("SEARCH api_document USING INDEX", plan)
+        else:
+            self.skipTest(f"No plan assertions for {connection.vendor}")
+
+    def test_latest_document_for_employee_uses_index(self):
+        self.assertNoFullScan(self.emp.documents.order_by("-uploaded_at")[:1])
+        if connection.vendor == "sqlite":
+            plan = self.emp.documents.order_by("-uploaded_at")[:1].explain()
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_hash_lookup_uses_index(self):
+        self.assertNoFullScan(documents_with_hash(self.latest_hash))
+
+    def test_verify_by_hash_only(self):
+        res = self.client.post(
+            "/api/verify/hash/", {"hash": self.latest_hash}, content_type="application/json"
+        ).json()
+        self.assertTrue(res["ok"])
+        self.assertEqual(res["employeeId"], self.emp.empid)
+        res = self.client.post(
+            "/api/verify/hash/", {"hash": "0" * 64}, content_type="application/json"
+        ).json()
+        self.assertFalse(res["ok"])
+
+
+class MerkleTests(APITestCase):
+    def hashes(self, count):
+        return [hashlib.sha256(str(n).encode()).hexdigest() for n in range(count)]
+
+    def test_every_proof_verifies_for_odd_and_even_trees(self):
+        for count in range(1, 10):
+            leaves = self.hashes(count)
+            root, proofs = merkle.build_tree(leaves)
+            for leaf, proof in zip(leaves, proofs):
+                self.assertTrue(merkle.verify_proof(leaf, proof, root))
+                self.assertLessEqual(len(proof), count.bit_length())
+
+    def test_wrong_leaf_or_root_fails(self):
+        leaves = self.hashes(5)
+        root, proofs = merkle.build_tree(leaves)
+        self.assertFalse(merkle.verify_proof(leaves[1], proofs[0], root))
+        self.assertFalse(merkle.verify_proof(leaves[0], proofs[0], "0" * 64))
+
+    def test_batches_pending_documents_and_serves_proofs(self):
+        emp = make_employee()
+        leaves = self.hashes(3)
+        for content_hash in leaves:
+            make_document(emp, content_hash)
+        batch = merkle.batch_pending_documents()
+        self.assertEqual(batch.leaf_count, 3)
+        self.assertIsNone(merkle.batch_pending_documents())
+
+        res = self.client.get(f"/api/verify/proof/{leaves[2]}/").json()
+        self.assertTrue(res["ok"])
+        self.assertEqual(res["root"], batch.root)
+        proof = [(step["side"], step["hash"]) for step in res["proof"]]
+        self.assertTrue(merkle.verify_proof(leaves[2], proof, res["root"]))
+
+        res = self.client.get(f"/api/verify/proof/{'0' * 64}/").json()
+        self.assertFalse(res["ok"])
+
+    def test_a_late_commit_with_a_lower_id_is_still_batched(self):
+        emp = make_employee()
+        early, late = self.hashes(2)
+        slow = make_document(emp, early)
+        fast = make_document(emp, late)
+        # The higher id was sealed while the lower one's upload was still in flight.
+        batch = MerkleBatch.objects.create(root=merkle.hash_leaf(late), leaf_count=1)
+        MerkleLeaf.objects.create(batch=batch, document=fast, leaf_index=0, proof=[])
+
+        batch = merkle.batch_pending_documents()
+        self.assertEqual(list(batch.leaves.values_list("document_id", flat=True)), [slow.pk])
+
+
+class LedgerTests(BlobStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.emp = make_employee()
+
+    def upload(self, data):
+        upload = SimpleUploadedFile("cert.pdf", data, content_type="application/pdf")
+        return self.client.post("/api/documents/", {"file": upload}, **auth_header(self.emp))
+
+    def test_empid_collation_matches_the_employee_key(self):
+        # MySQL rejects (error 1267) or cannot index a comparison across collations.
+        self.assertEqual(
+            LedgerEntry._meta.get_field("empid").db_collation, Employee._meta.get_field("empid").db_collation
+        )
+
+    def test_upload_and_profile_update_append_chained_entries(self):
+        self.upload(b"first")
+        self.client.put(
+            "/api/profile/", {"firstName": "Jane"}, content_type="application/json",
+            **auth_header(self.emp),
+        )
+        first, second = LedgerEntry.objects.order_by("id")
+        self.assertEqual(first.event_type, "document.uploaded")
+        self.assertEqual(first.prev_hash, ledger.GENESIS_HASH)
+        self.assertEqual(second.event_type, "profile.updated")
+        self.assertEqual(second.prev_hash, first.entry_hash)
+        self.assertEqual(second.payload["fields"], ["firstName"])
+
+    def test_incremental_audit_only_checks_the_tail(self):
+        for n in range(3):
+            self.upload(f"doc {n}".encode())
+        self.assertEqual(ledger.audit().checked, 3)
+        self.upload(b"doc 3")
+        result = ledger.audit()
+        self.assertTrue(result.ok)
+        self.assertEqual(result.checked, 1)
+        self.assertEqual(ledger.audit(full=True).checked, 4)
+
+    def test_audit_detects_tampering(self):
+        for n in range(3):
+            self.upload(f"doc {n}".encode())
+        entry = LedgerEntry.objects.order_by("id")[1]
+        LedgerEntry.objects.filter(pk=entry.pk).update(payload={"documentHash": "0" * 64})
+        result = ledger.audit(full=True)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.broken_id, entry.pk)
+
+
+class AuthCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.emp = make_employee()
+        self.headers = auth_header(self.emp)
+
+    def test_token_is_verified_once(self):
+        with mock.patch.object(auth_utils, "decode_jwt", wraps=auth_utils.decode_jwt) as decode:
+            for _ in range(3):
+                self.assertEqual(self.client.get("/api/me/", **self.headers).status_code, 200)
+        self.assertEqual(decode.call_count, 1)
+
+    def test_employee_is_cached_and_dropped_on_email_change(self):
+        auth = auth_utils.jwt_auth
+        auth.get_employee(self.emp.empid)
+        with self.assertNumQueries(0):
+            auth.get_employee(self.emp.empid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(
+                "/api/profile/", {"email": "new@example.com"}, content_type="application/json",
+                **self.headers,
+            )
+        self.assertEqual(auth.get_employee(self.emp.empid).email, "new@example.com")
+
+    def test_logout_forgets_the_token(self):
+        self.client.get("/api/me/", **self.headers)
+        token = self.headers["HTTP_AUTHORIZATION"].split(" ", 1)[1]
+        self.assertIsNotNone(auth_utils._claims_cache.get(token))
+        self.client.post("/api/auth/logout/", **self.headers)
+        self.assertIsNone(auth_utils._claims_cache.get(token))
+
+    def test_missing_and_invalid_tokens(self):
+        self.assertEqual(self.client.get("/api/me/").status_code, 401)
+        res = self.client.get("/api/me/", HTTP_AUTHORIZATION="Bearer nope")
+        self.assertEqual(res.status_code, 401)
+        self.assertEqual(res.json()["detail"], "Invalid token")
+
+
+class PasswordTests(APITestCase):
+    def login(self, email, password):
+        return self.client.post(
+            "/api/auth/login/", {"email": email, "password": password},
+            content_type="application/json",
+        )
+
+    def test_register_stores_a_kdf_hash(self):
+        self.client.post(
+            "/api/auth/register/", {"email": "new@example.com", "password": "password123"},
+            content_type="application/json",
+        )
+        emp = Employee.objects.get(email="new@example.com")
+        self.assertTrue(emp.password_hash.startswith("scrypt$"))
+        self.assertEqual(self.login("new@example.com", "password123").status_code, 200)
+        self.assertEqual(self.login("new@example.com", "wrong-password").status_code, 401)
+
+    def test_legacy_sha256_is_rehashed_on_login(self):
+        emp = make_employee(password="password123")
+        self.assertEqual(self.login(emp.email, "password123").status_code, 200)
+        emp.refresh_from_db()
+        self.assertFalse(passwords.get_hasher().needs_rehash(emp.password_hash))
+        self.assertEqual(self.login(emp.email, "password123").status_code, 200)
+
+    def test_pool_applies_backpressure(self):
+        hasher = passwords.PasswordHasher(
+            algorithm="pbkdf2_sha256", iterations=1000, workers=1, max_pending=0, timeout=0.01
+        )
+        self.addCleanup(hasher.shutdown)
+        gate = threading.Event()
+        self.addCleanup(gate.set)
+        hasher._run(gate.wait)
+        with self.assertRaises(passwords.PasswordHasherBusy):
+            hasher.encode("password123")
+
+
+class AsyncAPITests(BlobStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.emp = make_employee()
+        PersonalInfo.objects.create(empid=self.emp, firstname="Jane", lastname="Doe")
+
+    def test_async_endpoints_match_sync_ones(self):
+        headers = auth_header(self.emp)
+        self.assertEqual(
+            self.client.get("/api/async/me/", **headers).json(),
+            self.client.get("/api/me/", **headers).json(),
+        )
+        upload = SimpleUploadedFile("cert.pdf", b"certificate", content_type="application/pdf")
+        res = self.client.post("/api/async/documents/", {"file": upload}, **headers).json()
+        self.assertTrue(res["ok"])
+        for claimed in (res["documentHash"], "0" * 64):
+            body = {"employeeId": self.emp.empid, "hash": claimed}
+            self.assertEqual(
+                self.client.post("/api/async/verify/", body, content_type="application/json").json(),
+                self.client.post("/api/verify/", body, content_type="application/json").json(),
+            )
+        self.assertEqual(self.client.get("/api/async/me/").status_code, 401)
+
+
+class EmpidAllocatorTests(APITestCase):
+    def test_allocators_get_disjoint_blocks(self):
+        first = EmpidAllocator(block_size=3)
+        second = EmpidAllocator(block_size=3)
+        ids = [first.allocate(), second.allocate(), first.allocate(), second.allocate()]
+        self.assertEqual(len(set(ids)), 4)
+        for empid in ids:
+            self.assertRegex(empid, r"^E\d{9}$")
+
+    def test_block_costs_one_reservation(self):
+        allocator = EmpidAllocator(block_size=10)
+        allocator.allocate()
+        with self.assertNumQueries(0):
+            for _ in range(9):
+                allocator.allocate()
+
+    def test_register_does_no_existence_probes(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(
+                "/api/auth/register/", {"email": "new@example.com", "password": "password123"},
+                content_type="application/json",
+            )
+        self.assertTrue(res.json()["ok"])
+        self.assertRegex(Employee.objects.get(email="new@example.com").empid, r"^E\d{9}$")
+        self.assertFalse(any('"empid" =' in q["sql"] and "SELECT" in q["sql"] for q in queries))
+
+
+class BulkImportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create_user("issuer", password="pw", is_staff=True)
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        overrides = override_settings(EMPLOYEE_IMPORT_ROOT=root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def post_import(self, name, content):
+        upload = SimpleUploadedFile(name, content.encode())
+        return self.client.post("/api/employees/import/", {"file": upload})
+
+    def import_file(self, name, content):
+        """Queue the file, run the worker as cron would, and return the import's report."""
+        res = self.post_import(name, content)
+        self.assertEqual(res.status_code, 202)
+        call_command("run_employee_imports", stdout=io.StringIO())
+        status = self.client.get(f"/api/employees/import/{res.json()['importId']}/").json()
+        self.assertEqual(status["status"], "done")
+        return status["report"]
+
+    def test_requires_staff(self):
+        self.assertEqual(self.post_import("people.csv", "email\n").status_code, 401)
+
+    def test_csv_import_reports_bad_rows(self):
+        make_employee(email="taken@example.com")
+        self.client.force_login(self.staff)
+        csv_data = (
+            "email,firstName,lastName,mobile,address,jobDesignation,department\n"
+            "ann@example.com,Ann,Lee,12345,1 Road,Engineer,R&D\n"
+            "not-an-email,Bob,Ray,,,,\n"
+            "taken@example.com,Cy,Dee,,,,\n"
+            "dan@example.com,D4n,Oh,,,,\n"
+            "ann@example.com,Ann,Again,,,,\n"
+            "eve@example.com,,,,,Analyst,Finance\n"
+        )
+        with override_settings(EMPLOYEE_IMPORT_BATCH_SIZE=2):
+            report = self.import_file("people.csv", csv_data)
+        self.assertEqual(report["created"], 2)
+        self.assertEqual(sorted(e["row"] for e in report["errors"]), [2, 3, 4, 5])
+        ann = Employee.objects.get(email="ann@example.com")
+        self.assertEqual(ann.password_hash, "!")
+        self.assertEqual(ann.personal_info.get().lastname, "Lee")
+        self.assertEqual(ann.contact_info.get().address, "1 Road")
+        eve = Employee.objects.get(email="eve@example.com")
+        self.assertEqual(eve.employment_info.get().department, "Finance")
+        self.assertFalse(eve.personal_info.exists())
+
+    def test_ndjson_import_with_password(self):
+        self.client.force_login(self.staff)
+        rows = [
+            json.dumps({"email": "fay@example.com", "password": "password123", "firstName": "Fay"}),
+            "{broken",
+        ]
+        report = self.import_file("people.ndjson", "\n".join(rows))
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(report["errors"][0]["row"], 2)
+        res = self.client.post(
+            "/api/auth/login/", {"email": "fay@example.com", "password": "password123"},
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 200)
+
+    def test_imports_hash_on_their_own_pool(self):
+        self.client.force_login(self.staff)
+        rows = [json.dumps({"email": "gus@example.com", "password": "password123"})]
+        with mock.patch.object(passwords.get_hasher(), "_run", side_effect=AssertionError("login pool used")):
+            report = self.import_file("people.ndjson", "\n".join(rows))
+        self.assertEqual(report["created"], 1)
+
+    def test_a_busy_hasher_fails_only_its_batch(self):
+        self.client.force_login(self.staff)
+        rows = [
+            json.dumps({"email": f"{name}@example.com", "password": "password123"})
+            for name in ("hal", "ivy")
+        ]
+        hasher = passwords.get_import_hasher()
+        busy = [passwords.PasswordHasherBusy("Too many password hashes in flight")]
+
+        def encode_many(pws):
+            if busy:
+                raise busy.pop()
+            return [passwords._encode(hasher.algorithm, hasher.params, pw) for pw in pws]
+
+        with override_settings(EMPLOYEE_IMPORT_BATCH_SIZE=1), \
+                mock.patch.object(hasher, "encode_many", side_effect=encode_many):
+            report = self.import_file("people.ndjson", "\n".join(rows))
+        self.assertEqual((report["created"], report["failed"]), (1, 1))
+        self.assertEqual(report["errors"][0]["row"], 1)
+        self.assertTrue(Employee.objects.filter(email="ivy@example.com").exists())
+
+
+    def test_password_columns_are_validated_per_row(self):
+        self.client.force_login(self.staff)
+        prehashed = passwords._encode("pbkdf2_sha256", (1000,), "password123")
+        rows = [
+            {"email": "jo@example.com", "passwordHash": prehashed},
+            {"email": "kim@example.com", "password": 12345678},
+            {"email": "lou@example.com", "passwordHash": "not-a-hash"},
+            {"email": "max@example.com", "password": "password123", "passwordHash": prehashed},
+        ]
+        with mock.patch.object(passwords.get_import_hasher(), "_run", side_effect=AssertionError("hashed")):
+            report = self.import_file("people.ndjson", "\n".join(json.dumps(r) for r in rows))
+        self.assertEqual(report["created"], 1)
+        self.assertEqual([e["row"] for e in report["errors"]], [2, 3, 4])
+        self.assertEqual(Employee.objects.get(email="jo@example.com").password_hash, prehashed)
+        res = self.client.post(
+            "/api/auth/login/", {"email": "jo@example.com", "password": "password123"},
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 200)
+
+    def test_passwordless_employees_set_a_password_from_an_invite(self):
+        self.client.force_login(self.staff)
+        self.import_file("people.csv", "email\nned@example.com\n")
+        emp = Employee.objects.get(email="ned@example.com")
+        token = self.client.post(f"/api/employees/{emp.empid}/invite/").json()["token"]
+        self.client.logout()
+
+        def set_password(password):
+            return self.client.post(
+                "/api/auth/set-password/", {"token": token, "password": password},
+                content_type="application/json",
+            ).json()
+
+        self.assertFalse(set_password("short")["ok"])
+        self.assertTrue(set_password("password123")["ok"])
+        self.assertFalse(set_password("password456")["ok"])  # the token is spent
+        res = self.client.post(
+            "/api/auth/login/", {"email": "ned@example.com", "password": "password123"},
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 200)
+
+    def test_imports_left_running_by_a_dead_worker_are_reclaimed(self):
+        self.client.force_login(self.staff)
+        import_id = self.post_import("people.csv", "email\nola@example.com\n").json()["importId"]
+        self.assertEqual(str(bulk_import.claim_import(stale_seconds=60).pk), import_id)
+        self.assertIsNone(bulk_import.claim_import(stale_seconds=60))
+        EmployeeImport.objects.filter(pk=import_id).update(started_at=timezone.now() - datetime.timedelta(minutes=2))
+        job = bulk_import.run_import(bulk_import.claim_import(stale_seconds=60))
+        self.assertEqual((job.status, job.report["created"]), ("done", 1))
+        self.assertEqual(list(bulk_import.import_root().iterdir()), [])
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create_user("issuer", password="pw", is_staff=True)
+        for n in range(5):
+            emp = make_employee(empid=f"emp100000{n}", email=f"e{n}@example.com")
+            PersonalInfo.objects.create(empid=emp, firstname=f"First{n}", lastname="Last")
+        make_document(Employee.objects.get(pk="emp1000003"), "ab" * 32, name="cv.pdf")
+
+    def test_requires_staff(self):
+        self.assertEqual(self.client.get("/api/employees/export/").status_code, 401)
+
+    def test_csv_export_pages_by_empid(self):
+        self.client.force_login(self.staff)
+        with override_settings(EMPLOYEE_EXPORT_PAGE_SIZE=2):
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get("/api/employees/export/?format=csv")
+                body = b"".join(res.streaming_content).decode()
+        lines = body.splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["employeeId", "email", "firstName"])
+        self.assertEqual([line.split(",")[0] for line in lines[1:]], [f"emp100000{n}" for n in range(5)])
+        self.assertIn("ab" * 32, lines[4])
+        # Three pages of rows plus the empty page that ends the scan.
+        pages = [q for q in ctx.captured_queries if "api_employee" in q["sql"]]
+        self.assertEqual(len(pages), 4)
+
+    def test_ndjson_export(self):
+        self.client.force_login(self.staff)
+        res = self.client.get("/api/employees/export/?format=ndjson")
+        rows = [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]["firstName"], "First0")
+
+    def test_unknown_format(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get("/api/employees/export/?format=xml").status_code, 400)
+
+
+class ProfileUpdateTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.emp = make_employee()
+        PersonalInfo.objects.create(empid=self.emp, firstname="Jane", lastname="Doe")
+        self.headers = auth_header(self.emp)
+
+    def put(self, payload):
+        return self.client.put(
+            "/api/profile/", payload, content_type="application/json", **self.headers
+        )
+
+    def test_two_table_update_takes_five_statements(self):
+        payload = {"firstName": "Janet", "lastName": "Doe", "mobile": "555 0100", "dateOfBirth": "1990-02-03"}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.put(payload)
+        # Read; personal and contact upserts; ledger tail lock and insert. The
+        # other two are the SAVEPOINT pair transaction.atomic() issues inside
+        # the test's transaction (an unlogged BEGIN/COMMIT in production).
+        self.assertEqual(len(ctx.captured_queries), 7, ctx.captured_queries)
+        profile = res.json()["profile"]
+        self.assertEqual(profile["firstName"], "Janet")
+        self.assertEqual(profile["dateOfBirth"], "1990-02-03")
+        self.assertEqual(profile["mobile"], "555 0100")
+        self.assertEqual(self.client.get("/api/profile/", **self.headers).json()["profile"], profile)
+        self.assertEqual(PersonalInfo.objects.filter(empid=self.emp).count(), 1)
+        entry = LedgerEntry.objects.get()
+        self.assertEqual(entry.payload["fields"], ["dateOfBirth", "firstName", "mobile"])
+
+    def test_updating_every_table_takes_seven_statements(self):
+        payload = {
+            "email": "janet@example.com", "firstName": "Janet", "mobile": "555 0100",
+            "department": "R&D", "jobDesignation": "Engineer",
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.put(payload)
+        # Read; employee, personal, contact and employment writes; ledger tail
+        # lock and insert; plus the test transaction's SAVEPOINT pair.
+        self.assertEqual(len(ctx.captured_queries), 9, ctx.captured_queries)
+        profile = res.json()["profile"]
+        self.assertEqual((profile["email"], profile["department"]), ("janet@example.com", "R&D"))
+        self.assertEqual(ContactInfo.objects.get(empid=self.emp).email, "janet@example.com")
+        self.assertEqual(EmploymentInfo.objects.get(empid=self.emp).job_designation, "Engineer")
+
+    def test_unchanged_update_is_a_single_read(self):
+        with self.assertNumQueries(1):
+            res = self.put({"firstName": "Jane"})
+        self.assertTrue(res.json()["ok"])
+        self.assertFalse(LedgerEntry.objects.exists())
+
+    def test_email_conflicts_and_bad_dates_are_rejected(self):
+        make_employee(empid="emp1000002", email="taken@example.com")
+        self.assertEqual(self.put({"email": "Taken@example.com"}).json()["error"], "Email already in use")
+        self.assertEqual(self.put({"dateOfBirth": "1990-13-01"}).json()["error"], "Invalid date of birth")
+        # Claimed between the read and the write: the email UPDATE fails.
+        with mock.patch("api.api.Exists", lambda qs: Value(False, output_field=BooleanField())):
+            self.assertEqual(self.put({"email": "taken@example.com"}).json()["error"], "Email already in use")
+        self.assertEqual(Employee.objects.get(pk=self.emp.pk).email, "jane@example.com")
+        # Other constraint failures are not reported as email conflicts.
+        with mock.patch.object(ledger, "append", side_effect=IntegrityError("prev_hash")):
+            with self.assertRaises(IntegrityError):
+                self.put({"firstName": "Janet"})
+        res = self.put({"email": "jane.doe@example.com"})
+        self.assertEqual(res.json()["profile"]["email"], "jane.doe@example.com")
+        self.assertEqual(ContactInfo.objects.get(empid=self.emp).email, "jane.doe@example.com")
+
+
+class ProfileETagTests(BlobStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.emp = make_employee()
+        self.headers = auth_header(self.emp)
+
+    def get(self, url="/api/profile/", **headers):
+        return self.client.get(url, **self.headers, **headers)
+
+    def test_polls_are_served_from_the_profile_cache(self):
+        with self.assertNumQueries(1):
+            etag = self.get()["ETag"]
+        for url in ("/api/profile/", "/api/me/", "/api/async/me/"):
+            with self.assertNumQueries(0):
+                res = self.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, 304)
+            self.assertEqual(res.content, b"")
+            with self.assertNumQueries(0):
+                res = self.get(url)
+            self.assertEqual(res["ETag"], etag)
+
+    def test_writes_change_the_etag(self):
+        etag = self.get()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.put(
+                "/api/profile/", {"firstName": "Janet"}, content_type="application/json", **self.headers
+            )
+        self.assertNotEqual(res["ETag"], etag)
+        res = self.get(HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, 304)
+
+        upload = SimpleUploadedFile("cert.pdf", b"new certificate", content_type="application/pdf")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/documents/", {"file": upload}, **self.headers)
+        res = self.get(HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["profile"]["documentHash"], sha256_hex("new certificate"))
+
+    def test_a_load_racing_a_write_is_not_cached(self):
+        started = profiles.profile_cache_generation()
+        profiles.forget_profiles(self.emp.empid)  # a write committed mid-load
+        profiles.cache_profile(self.emp.empid, 0, {"firstName": "stale"}, started)
+        self.assertIsNone(profiles.cached_profile(self.emp.empid))
+
+
+class EmployeeListTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user("issuer", password="pw", is_staff=True))
+        people = [
+            ("Ann", "Lee", "R&D", "Engineer"),
+            ("Bob", "Ray", "R&D", "Manager"),
+            ("Cy", "Lewis", "R&D", "Engineer"),
+            ("Dan", "Oh", "Finance", "Engineer"),
+            ("Ann", "Moss", "R&D", "Engineer"),
+        ]
+        for n, (first, last, department, designation) in enumerate(people):
+            emp = make_employee(empid=f"emp100000{n}", email=f"e{n}@example.com")
+            PersonalInfo.objects.create(empid=emp, firstname=first, lastname=last)
+            EmploymentInfo.objects.create(empid=emp, department=department, job_designation=designation)
+
+    def list(self, **params):
+        return self.client.get("/api/employees/", params).json()
+
+    def test_keyset_pages_cover_every_match_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {"department": "R&D", "designation": "Engineer", "limit": 2}
+            page = self.list(**params, **({"cursor": cursor} if cursor else {}))
+            seen += [row["employeeId"] for row in page["results"]]
+            cursor = page["nextCursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, ["emp1000000", "emp1000002", "emp1000004"])
+
+    def list_plans(self, table="api_employee", **params):
+        """EXPLAIN QUERY PLAN of each query the listing ran against table."""
+        if connection.vendor != "sqlite":
+            self.skipTest(f"No plan assertions for {connection.vendor}")
+        queries = CaptureQueriesContext(connection)
+        with queries:
+            self.list(**params)
+        plans = []
+        for query in queries.captured_queries:
+            if query["sql"].startswith(f'SELECT "{table}".'):
+                rows = connection.cursor().execute("EXPLAIN QUERY PLAN " + query["sql"]).fetchall()
+                plans.append(" ".join(row[-1] for row in rows))
+        return plans
+
+    def test_department_page_walks_the_index_in_order(self):
+        plan = self.list_plans(department="R&D", cursor="emp1000001")[-1]
+        self.assertIn("USING COVERING INDEX employment_dept_emp_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_name_pages_read_the_name_indexes_in_order(self):
+        # A page that finishes the last-name matches and starts on first names.
+        cursor = self.list(name="le", limit=1)["nextCursor"]
+        last, first = self.list_plans("api_personalinfo", name="le", cursor=cursor)
+        self.assertIn("INDEX personal_last_emp_idx", last)
+        self.assertIn("INDEX personal_first_emp_idx", first)
+        self.assertNotIn("TEMP B-TREE", last + first)
+
+    def test_name_prefix(self):
+        ids = lambda name: [row["employeeId"] for row in self.list(name=name)["results"]]
+        self.assertEqual(ids("le"), ["emp1000000", "emp1000002"])
+        self.assertEqual(ids("Ann M"), ["emp1000004"])
+        self.assertEqual(ids("ann"), ["emp1000000", "emp1000004"])
+
+    def test_name_pages_cover_last_then_first_name_matches_once(self):
+        for n, (first, last) in enumerate([("Lea", "Lane"), ("Leo", "Bay"), ("Lee", "Leroy")], start=5):
+            emp = make_employee(empid=f"emp100000{n}", email=f"e{n}@example.com")
+            PersonalInfo.objects.create(empid=emp, firstname=first, lastname=last)
+        seen, cursor = [], None
+        while True:
+            page = self.list(name="le", limit=2, **({"cursor": cursor} if cursor else {}))
+            seen += [row["employeeId"] for row in page["results"]]
+            cursor = page["nextCursor"]
+            if not cursor:
+                break
+        # Lee, Leroy, Lewis by last name; then Lea and Leo by first name.
+        self.assertEqual(seen, ["emp1000000", "emp1000007", "emp1000002", "emp1000005", "emp1000006"])
+        self.assertEqual(self.client.get("/api/employees/", {"name": "le", "cursor": "bogus"}).status_code, 400)
+
+    def test_requires_staff(self):
+        self.client.logout()
+        self.assertEqual(self.client.get("/api/employees/").status_code, 401)
+
+
+class VerificationCacheTests(BlobStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.emp = make_employee()
+
+    def verify(self, document_hash, employee_id="emp1000001"):
+        return self.client.post(
+            "/api/verify/", {"employeeId": employee_id, "hash": document_hash},
+            content_type="application/json",
+        ).json()
+
+    def upload(self, data):
+        upload = SimpleUploadedFile("cert.pdf", data, content_type="application/pdf")
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/documents/", {"file": upload}, **auth_header(self.emp))
+        return res.json()["documentHash"]
+
+    def test_repeat_verification_skips_the_database(self):
+        first = self.upload(b"v1")
+        self.assertTrue(self.verify(first)["ok"])
+        self.assertIn("No record found", self.verify(first, "emp9999999")["error"])
+        with self.assertNumQueries(0):
+            self.assertTrue(self.verify(first)["ok"])
+            self.assertIn("No record found", self.verify(first, "EMP9999999")["error"])
+        stats = get_verification_cache().stats()
+        self.assertEqual((stats["localHits"], stats["misses"]), (2, 2))
+
+    def test_upload_invalidates_the_cached_hash(self):
+        first = self.upload(b"v1")
+        self.assertTrue(self.verify(first)["ok"])
+        second = self.upload(b"v2")
+        self.assertFalse(self.verify(first)["ok"])
+        self.assertTrue(self.verify(second)["ok"])
+
+    def test_shared_backend_serves_other_processes(self):
+        loads = []
+        load = lambda empids: loads.append(empids) or {e.casefold(): "h" for e in empids}
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            caches["default"].clear()
+            one, two = VerificationCache(backend="default"), VerificationCache(backend="default")
+            one.get_many(["E1"], load)
+            self.assertEqual(two.get_many(["e1"], load), {"e1": "h"})
+            self.assertEqual(len(loads), 1)
+            self.assertEqual(two.stats()["sharedHits"], 1)
+            one.forget("E1")
+            two.local.clear()
+            two.get_many(["E1"], load)
+            self.assertEqual(len(loads), 2)
+
+    def test_async_lookups_use_the_shared_tier(self):
+        loads = []
+
+        async def aload(empids):
+            loads.append(empids)
+            return {e.casefold(): "h" for e in empids}
+
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            caches["default"].clear()
+            one, two = VerificationCache(backend="default"), VerificationCache(backend="default")
+            async_to_sync(one.aget_many)(["E1"], aload)
+            self.assertEqual(async_to_sync(two.aget_many)(["e1"], aload), {"e1": "h"})
+            self.assertEqual(len(loads), 1)
+            two.forget("E1")
+            async_to_sync(two.aget_many)(["E1"], aload)
+            self.assertEqual(len(loads), 2)
+
+    async def test_async_verify_loads_misses_on_the_async_orm(self):
+        body = {"employeeId": "EMP1000001", "hash": "0" * 64}
+        with mock.patch("api.async_api.sync_to_async", side_effect=AssertionError("thread hop")):
+            res = await AsyncClient().post("/api/async/verify/", body, content_type="application/json")
+        self.assertEqual(res.json()["error"], "No document found for this employee.")
+        self.assertEqual(get_verification_cache().stats()["misses"], 1)
+
+    def test_local_entries_expire_quickly_without_a_shared_backend(self):
+        # Another worker's upload cannot evict this process's entries.
+        self.assertEqual(VerificationCache(ttl=300, local_ttl=5).local.ttl, 5)
+
+    def test_a_fill_racing_a_forget_is_not_cached(self):
+        loads = []
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            caches["default"].clear()
+            cache, other = VerificationCache(backend="default"), VerificationCache(backend="default")
+
+            def load(empids):
+                loads.append(empids)
+                if len(loads) == 1:
+                    # The upload commits after this load read the old hash.
+                    cache.forget("E1")
+                    other.forget("E1")
+                return {e.casefold(): f"h{len(loads)}" for e in empids}
+
+            self.assertEqual(cache.get_many(["E1"], load), {"e1": "h1"})
+            self.assertEqual(cache.get_many(["E1"], load), {"e1": "h2"})
+            self.assertEqual(VerificationCache(backend="default").get_many(["E1"], load), {"e1": "h2"})
+            self.assertEqual(len(loads), 2)
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.clear()
+        self.emp = make_employee()
+
+    def test_records_queries_and_sizes_per_route(self):
+        for _ in range(2):
+            res = self.client.get("/api/profile/", **auth_header(self.emp))
+        stats = metrics.registry.snapshot("GET", "api/profile/")
+        self.assertEqual(stats.latency.count, 2)
+        self.assertEqual(stats.queries.sum, 1)  # the second request hits the profile cache
+        self.assertEqual(stats.statuses[200], 2)
+        self.assertEqual(stats.response_bytes, 2 * len(res.content))
+
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('api_requests_total{method="GET",route="api/profile/",status="200"} 2', body)
+        self.assertIn('api_db_queries_per_request_bucket{method="GET",route="api/profile/",le="1"} 2', body)
+
+    async def test_async_routes_count_queries_run_on_worker_threads(self):
+        client = AsyncClient()
+        res = await client.get("/api/async/me/", headers={"Authorization": auth_header(self.emp)["HTTP_AUTHORIZATION"]})
+        self.assertEqual(res.status_code, 200)
+        await client.post(
+            "/api/async/verify/", {"employeeId": "emp1000001", "hash": "x"}, content_type="application/json"
+        )
+        self.assertEqual(metrics.registry.snapshot("GET", "api/async/me/").queries.sum, 1)
+        self.assertEqual(metrics.registry.snapshot("POST", "api/async/verify/").queries.sum, 1)
+
+    def test_file_downloads_count_their_bytes(self):
+        response = FileResponse(io.BytesIO(b"x" * 1000))
+        request = RequestFactory().get("/download")
+        metrics.MetricsMiddleware(lambda r: response)(request)
+        response.close()
+        self.assertEqual(metrics.registry.snapshot("GET", "<unmatched>").response_bytes, 1000)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        res = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(res.status_code, 200)
+
+    def test_slow_requests_are_logged_with_sql(self):
+        with override_settings(METRICS_SLOW_REQUEST_SECONDS=0):
+            # A fresh client builds a fresh middleware stack that sees the setting.
+            with self.assertLogs("api.slow_requests", "WARNING") as logs:
+                Client().get("/api/profile/", **auth_header(self.emp))
+        self.assertIn("api/profile/", logs.output[0])
+        self.assertIn("api_employee", logs.output[0])
+
+
+class BenchmarkBaselineTests(TestCase):
+    def test_regressions_beyond_tolerance_fail(self):
+        from .management.commands.bench_api import Command
+
+        def report(p95, rps, queries, errors=0):
+            return {"scenarios": {"me": {
+                "p95_ms": p95, "throughput_rps": rps, "queries_per_request": queries, "errors": errors,
+            }}}
+
+        baseline = report(10.0, 100.0, 1.0)
+        self.assertEqual(Command()._compare(baseline, report(12.0, 90.0, 1.2), 0.25), [])
+        regressions = Command()._compare(baseline, report(20.0, 50.0, 8.0, errors=1), 0.25)
+        self.assertEqual(len(regressions), 4)
+
+
+class DocumentDedupTests(BlobStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = make_employee()
+        self.bob = make_employee(empid="emp1000002", email="bob@example.com")
+
+    def upload(self, emp, data=b"same certificate"):
+        upload = SimpleUploadedFile("cert.pdf", data, content_type="application/pdf")
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/documents/", {"file": upload}, **auth_header(emp)).json()
+
+    def delete(self, emp, document_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.delete(f"/api/documents/{document_id}/", **auth_header(emp))
+
+    def test_repeated_uploads_share_one_content_row(self):
+        first = self.upload(self.alice)
+        second = self.upload(self.alice)
+        third = self.upload(self.bob)
+        self.assertEqual(len({first["documentHash"], second["documentHash"], third["documentHash"]}), 1)
+        content = DocumentContent.objects.get()
+        self.assertEqual(content.ref_count, 3)
+        self.assertEqual(content.documents.count(), 3)
+
+    def test_deletes_release_references(self):
+        first = self.upload(self.alice)
+        second = self.upload(self.bob)
+        self.assertEqual(self.delete(self.bob, first["documentId"]).status_code, 404)
+        self.assertTrue(self.delete(self.alice, first["documentId"]).json()["ok"])
+        self.assertEqual(DocumentContent.objects.get().ref_count, 1)
+        # Deleting the employee cascades to their documents, releasing the last reference.
+        self.bob.delete()
+        self.assertFalse(DocumentContent.objects.exists())
+        self.assertEqual(LedgerEntry.objects.filter(event_type="document.deleted").count(), 1)
+
+        # The blob outlives its row until prune_blobs runs past the grace period.
+        self.assertTrue(self.store.exists(second["documentHash"]))
+        referenced = lambda hashes: DocumentContent.objects.filter(pk__in=hashes).values_list("pk", flat=True)
+        self.assertEqual(self.store.prune_unreferenced(referenced, older_than=0)[0], 0)
+        self.assertEqual(self.store.prune_unreferenced(referenced, older_than=time.time() + 1)[0], 1)
+        self.assertFalse(self.store.exists(second["documentHash"]))
+
+
+class DocumentDownloadTests(BlobStoreTestCase):
+    DATA = bytes(range(256)) * 400
+
+    def setUp(self):
+        super().setUp()
+        self.emp = make_employee()
+        upload = SimpleUploadedFile("cert.pdf", self.DATA, content_type="application/pdf")
+        res = self.client.post("/api/documents/", {"file": upload}, **auth_header(self.emp)).json()
+        self.url = f"/api/documents/{res['documentId']}/"
+        self.etag = f'"{res["documentHash"]}"'
+
+    def get(self, emp=None, **headers):
+        return self.client.get(self.url, **auth_header(emp or self.emp), **headers)
+
+    def test_owner_streams_the_whole_document(self):
+        res = self.get()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b"".join(res.streaming_content), self.DATA)
+        self.assertEqual(res["ETag"], self.etag)
+        self.assertEqual(res["Content-Type"], "application/pdf")
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertIn('filename="cert.pdf"', res["Content-Disposition"])
+
+    def test_only_the_owner_or_staff(self):
+        other = make_employee(empid="emp1000002", email="bob@example.com")
+        self.assertEqual(self.get(other).status_code, 404)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.client.force_login(User.objects.create_user("issuer", password="pw", is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_ranges(self):
+        res = self.get(HTTP_RANGE="bytes=100-199")
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res["Content-Range"], f"bytes 100-199/{len(self.DATA)}")
+        self.assertEqual(b"".join(res.streaming_content), self.DATA[100:200])
+
+        res = self.get(HTTP_RANGE="bytes=-10")
+        self.assertEqual(b"".join(res.streaming_content), self.DATA[-10:])
+        self.assertEqual(self.get(HTTP_RANGE=f"bytes={len(self.DATA)}-").status_code, 416)
+        # A stale If-Range gets the full body.
+        self.assertEqual(self.get(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"').status_code, 200)
+
+    def test_if_none_match(self):
+        res = self.get(HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], self.etag)
+
+    def test_sendfile_offload(self):
+        path = self.store.path(self.etag.strip('"'))
+        with override_settings(DOCUMENT_SENDFILE="x-accel-redirect", DOCUMENT_SENDFILE_PREFIX="/protected/"):
+            res = self.get()
+        self.assertEqual(res["X-Accel-Redirect"], "/protected/" + path.relative_to(self.blob_root).as_posix())
+        self.assertEqual(res.content, b"")
+        with override_settings(DOCUMENT_SENDFILE="x-sendfile"):
+            self.assertEqual(self.get()["X-Sendfile"], str(path))
+
+
+class RendererTests(APITestCase):
+    def test_fast_and_fallback_encoders_agree(self):
+        data = {
+            "when": datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            "amount": decimal.Decimal("1.50"),
+            "id": uuid.UUID(int=7),
+            "text": "✅ ok",
+            1: [None, True],
+        }
+        fast = renderers.dumps(data)
+        with mock.patch.object(renderers, "orjson", None):
+            fallback = renderers.dumps(data)
+        self.assertEqual(json.loads(fast), json.loads(fallback))
+        self.assertEqual(json.loads(fast)["when"], "2024-05-01T12:30:15.123Z")
+
+    def test_response_schemas_omit_unset_keys(self):
+        res = self.client.post(
+            "/api/verify/", {"employeeId": "nobody", "hash": "x"}, content_type="application/json"
+        )
+        self.assertEqual(res["Content-Type"], "application/json; charset=utf-8")
+        self.assertEqual(res.json(), {"ok": False, "error": "No record found for Employee ID: nobody"})
+        profile = self.client.get("/api/me/", **auth_header(make_employee())).json()
+        self.assertEqual(set(profile), {"ok", "profile"})
+        self.assertIsNone(profile["profile"]["documentHash"])
+
+
+class ThrottleTests(APITestCase):
+    def login(self, email="jane@example.com", **extra):
+        return self.client.post(
+            "/api/auth/login/", {"email": email, "password": "wrong-password"},
+            content_type="application/json", **extra,
+        )
+
+    @override_settings(API_THROTTLE_RATES={"login": {"account": "2/min"}})
+    def test_rejected_logins_do_no_work(self):
+        make_employee()
+        self.assertEqual(self.login().status_code, 401)
+        self.assertEqual(self.login(email=" JANE@example.com").status_code, 401)
+        with self.assertNumQueries(0), mock.patch.object(passwords, "_verify") as verify:
+            res = self.login()
+        self.assertEqual(res.status_code, 429)
+        verify.assert_not_called()
+        self.assertEqual(res["Retry-After"], "30")
+        self.assertEqual(self.login(email="other@example.com").status_code, 401)
+
+    @override_settings(API_THROTTLE_RATES={"verify": {"ip": "1/min"}})
+    def test_verify_is_limited_per_client_address(self):
+        payload = {"employeeId": "emp1000001", "hash": "x"}
+        for url in ("/api/verify/", "/api/async/verify/"):
+            self.client.post(url, payload, content_type="application/json")
+            res = self.client.post(url, payload, content_type="application/json")
+            self.assertEqual(res.status_code, 429)
+            res = self.client.post(url, payload, content_type="application/json", REMOTE_ADDR="10.0.0.2")
+            self.assertEqual(res.status_code, 200)
+            get_rate_limiter().clear()
+
+    @override_settings(API_THROTTLE_RATES={"verify_batch": {"ip": "5/min"}})
+    def test_batches_are_charged_per_item(self):
+        def batch(n):
+            items = [{"employeeId": f"emp{i:07d}", "hash": "x"} for i in range(n)]
+            return self.client.post("/api/verify/batch/", {"items": items}, content_type="application/json")
+
+        self.assertEqual(batch(3).status_code, 200)
+        res = batch(3)
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(res["Retry-After"], "12")
+        self.assertEqual(batch(2).status_code, 200)
+        get_rate_limiter().clear()
+        res = batch(6)  # more than the bucket ever holds
+        self.assertEqual(res.status_code, 429)
+        self.assertNotIn("Retry-After", res)
+
+    @override_settings(API_THROTTLE_RATES={"verify": {"ip": "1/min"}})
+    def test_hash_and_proof_lookups_are_limited(self):
+        self.client.post("/api/verify/hash/", {"hash": "x"}, content_type="application/json")
+        self.assertEqual(
+            self.client.post("/api/verify/hash/", {"hash": "x"}, content_type="application/json").status_code, 429
+        )
+        self.assertEqual(self.client.get(f"/api/verify/proof/{'ab' * 32}/").status_code, 429)
+
+    def test_buckets_refill_and_can_be_shared(self):
+        limiter = RateLimiter()
+        with mock.patch("api.throttling.time.time", return_value=1000.0) as now:
+            self.assertEqual([limiter.take("k", 2, 1.0)[0] for _ in range(3)], [True, True, False])
+            now.return_value = 1001.0
+            self.assertTrue(limiter.take("k", 2, 1.0)[0])
+
+            first, second = RateLimiter(backend="default"), RateLimiter(backend="default")
+            self.assertTrue(first.take("shared", 2, 0.01)[0])
+            self.assertTrue(second.take("shared", 2, 0.01)[0])
+            allowed, wait = second.take("shared", 2, 0.01)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 100.0)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # Outside a test transaction, so a mirrored replica connection sees committed rows.
+    databases = {"default", "replica"} if "replica" in settings.DATABASES else {"default"}
+
+    def setUp(self):
+        auth_utils.clear_auth_caches()
+        profiles.clear_profile_cache()
+        self.emp = make_employee()
+        self.router = PrimaryReplicaRouter()
+
+    def test_router_pins_to_primary_after_a_write(self):
+        state = RoutingState()
+        token = db_router._state.set(state)
+        try:
+            with override_settings(DATABASE_REPLICAS=["replica"]):
+                self.assertEqual(self.router.db_for_read(Employee), "default")  # not a replica view
+                state.use_replica = True
+                self.assertEqual(self.router.db_for_read(Employee), "replica")
+                self.router.db_for_write(Employee)
+                self.assertEqual(self.router.db_for_read(Employee), "default")
+        finally:
+            db_router._state.reset(token)
+        self.assertEqual(self.router.db_for_read(Employee), "default")  # outside any request
+
+    @skipUnless("replica" in settings.DATABASES, "needs a 'replica' alias (TEST MIRROR of default)")
+    def test_read_only_views_use_the_replica_until_the_client_writes(self):
+        with override_settings(DATABASE_REPLICAS=["replica"]):
+            with CaptureQueriesContext(connections["replica"]) as replica:
+                self.client.get("/api/profile/", **auth_header(self.emp))
+            self.assertEqual(len(replica.captured_queries), 1)
+
+            res = self.client.put(
+                "/api/profile/", {"firstName": "Jane"}, content_type="application/json",
+                **auth_header(self.emp),
+            )
+            self.assertIn(db_router.PIN_COOKIE, res.cookies)
+            with CaptureQueriesContext(connections["replica"]) as pinned:
+                profile = self.client.get("/api/profile/", **auth_header(self.emp)).json()["profile"]
+        self.assertEqual(profile["firstName"], "Jane")
+        self.assertEqual(pinned.captured_queries, [])
@@ -0,0 +1,167 @@
+# api/throttling.py
+"""Token-bucket rate limits for the public auth and verify endpoints.
+
+A rate "N/period" (API_THROTTLE_RATES[scope][kind]) is a bucket of N
+tokens that refills at N per period, so a client may burst N requests and
+then continue at the average rate. Buckets are keyed per scope and either:
+
+- ``"ip"``: the client address (Ninja's get_ident, see NINJA_NUM_PROXIES);
+- ``"account"``: the email or employee ID named in the JSON body, so one
+  target cannot be hammered from many addresses.
+
+A request normally costs one token. With per_item, it costs one token per
+element of that JSON list, so /verify/batch/ is limited in employee IDs
+resolved rather than in requests.
+
+Ninja runs throttles before it parses the payload or calls the handler,
+so a rejected request costs no query and no password hash.
+
+Buckets live in process. With API_THROTTLE_BACKEND naming a CACHES alias,
+a request the local bucket admits is also charged to a bucket in that
+cache, which holds the limit across workers; a client that drained its
+bucket here is still turned away without a cache round trip. The shared
+bucket is updated without a lock, so concurrent workers may admit a few
+requests more than the rate.
+"""
+import contextvars
+import hashlib
+import json
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from ninja.throttling import BaseThrottle
+
+from .caching import LRUCache
+
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+KEY_PREFIX = "throttle:"
+
+_wait = contextvars.ContextVar("throttle_wait", default=None)
+
+
+def parse_rate(rate: str):
+    """Return (capacity, tokens per second) for "N/period"."""
+    count, period = rate.split("/")
+    return int(count), int(count) / PERIODS[period]
+
+
+def _take(state, now: float, capacity: int, per_second: float, cost: int = 1):
+    """Spend cost tokens; return (new state, allowed, seconds until they are available)."""
+    tokens, updated = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * per_second)
+    if tokens >= cost:
+        return (tokens - cost, now), True, 0.0
+    return (tokens, now), False, (cost - tokens) / per_second
+
+
+class RateLimiter:
+    def __init__(self, maxsize: int = 100000, backend: str | None = None):
+        self.backend = backend
+        self.local = LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.backend] if self.backend else None
+
+    def take(self, key: str, capacity: int, per_second: float, cost: int = 1):
+        """Return (allowed, seconds to wait) for spending cost tokens from key's bucket."""
+        now = time.time()
+        # A bucket refilled to capacity is the same as no bucket, so let it expire then.
+        full_in = capacity / per_second
+        with self._lock:
+            state, allowed, wait = _take(self.local.get(key), now, capacity, per_second, cost)
+            self.local.set(key, state, expires_at=now + full_in)
+        if not allowed or self.shared is None:
+            return allowed, wait
+        shared_key = KEY_PREFIX + hashlib.sha256(key.encode()).hexdigest()
+        state, allowed, wait = _take(self.shared.get(shared_key), now, capacity, per_second, cost)
+        self.shared.set(shared_key, state, math.ceil(full_in))
+        return allowed, wait
+
+    def clear(self):
+        self.local.clear()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(
+                    maxsize=getattr(settings, "API_THROTTLE_MAX_KEYS", 100000),
+                    backend=getattr(settings, "API_THROTTLE_BACKEND", None),
+                )
+    return _limiter
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Ninja throttle for one API_THROTTLE_RATES scope and key kind.
+
+    For kind "account", field names the JSON body key holding the account.
+    per_item names a JSON body list whose length is the request's cost.
+    Requests without a key (or scopes without a rate) are not limited.
+    """
+
+    def __init__(self, scope: str, kind: str = "ip", field: str | None = None,
+                 per_item: str | None = None):
+        self.scope = scope
+        self.kind = kind
+        self.field = field
+        self.per_item = per_item
+
+    def _json_body(self, request):
+        if request.content_type != "application/json":
+            return {}
+        try:
+            body = json.loads(request.body)
+        except ValueError:
+            return {}
+        return body if isinstance(body, dict) else {}
+
+    def get_key(self, request):
+        if self.kind == "ip":
+            return self.get_ident(request)
+        value = self._json_body(request).get(self.field)
+        return value.strip().casefold() if isinstance(value, str) else None
+
+    def get_cost(self, request) -> int:
+        if not self.per_item:
+            return 1
+        items = self._json_body(request).get(self.per_item)
+        return max(1, len(items)) if isinstance(items, list) else 1
+
+    def allow_request(self, request):
+        _wait.set(None)
+        rate = getattr(settings, "API_THROTTLE_RATES", {}).get(self.scope, {}).get(self.kind)
+        key = self.get_key(request) if rate else None
+        if not key:
+            return True
+        capacity, per_second = parse_rate(rate)
+        cost = self.get_cost(request)
+        if cost > capacity:
+            return False  # could never be afforded; no useful Retry-After
+        allowed, wait = get_rate_limiter().take(f"{self.scope}:{self.kind}:{key}", capacity, per_second, cost)
+        _wait.set(wait)
+        return allowed
+
+    def wait(self):
+        # Throttle objects are shared between requests; the wait is per request.
+        return _wait.get()
+
+
+def retry_after_handler(api):
+    """Exception handler for ninja's Throttled that also sets Retry-After."""
+    def handler(request, exc):
+        response = api.create_response(request, {"detail": str(exc)}, status=exc.status_code)
+        if exc.wait is not None:
+            response["Retry-After"] = str(max(1, math.ceil(exc.wait)))
+        return response
+    return handler
@@ -0,0 +1,66 @@
+# api/upload_limits.py
+"""Enforce DOCUMENT_MAX_UPLOAD_BYTES while a multipart body is being read.
+
+Django parses the whole multipart body (into memory or a temp file) before
+a view sees request.FILES, so a size check in the view comes after the
+bandwidth and disk are already spent. MaxSizeUploadHandler runs ahead of
+Django's own handlers. It refuses a Content-Length that cannot fit, then
+counts file bytes as they arrive and stops at the first chunk over the
+limit. Either way the client gets a 413.
+
+Install it with ``@decorate_view(limit_upload_size)`` under the route
+decorator. It is added before authentication runs, but the body is only
+read when the view's File parameter is parsed.
+"""
+from asyncio import iscoroutinefunction
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from ninja.errors import HttpError
+
+# Room in Content-Length for multipart boundaries and part headers.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    def __init__(self, request=None, max_bytes: int = 0):
+        super().__init__(request)
+        self.max_bytes = max_bytes
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > self.max_bytes + MULTIPART_OVERHEAD:
+            raise HttpError(413, "File too large")
+        return None  # let the normal parser read the body
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            raise HttpError(413, "File too large")
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None  # the next handler builds the UploadedFile
+
+
+def _install(request):
+    max_bytes = getattr(settings, "DOCUMENT_MAX_UPLOAD_BYTES", None)
+    if max_bytes is not None:
+        request.upload_handlers.insert(0, MaxSizeUploadHandler(request, max_bytes))
+
+
+def limit_upload_size(run):
+    """Wrap a Ninja operation so its request body is size-checked while streaming."""
+    if iscoroutinefunction(run):
+        @wraps(run)
+        async def async_wrapper(request, *args, **kwargs):
+            _install(request)
+            return await run(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(run)
+    def wrapper(request, *args, **kwargs):
+        _install(request)
+        return run(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,204 @@
+# api/verify_cache.py
+"""Cache of each employee's latest document hash, for /verify/.
+
+Two tiers: an in-process LRU, and optionally a shared Django cache
+(VERIFY_CACHE_BACKEND) so every worker benefits from one worker's miss.
+Uploads and deletes forget the uploader's entry once their transaction
+commits, but only in their own process and the shared tier. Other workers'
+LRUs cannot be reached, so local entries live at most
+VERIFY_CACHE_LOCAL_TTL seconds, with or without a shared backend. That
+bounds how long another worker can report a fresh upload as tampered.
+
+Fills are versioned by a write generation, so a load that read the old
+hash before an upload committed cannot overwrite the later forget():
+
+- locally, forget() records the generation it ran at, and a fill that
+  started earlier is not cached;
+- in the shared tier, forget() increments a per-employee generation key,
+  entries are stored as (generation, value), and entries whose generation
+  is stale are ignored.
+
+Values are strings: the hash, NO_DOCUMENT or NO_EMPLOYEE.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .caching import LRUCache
+
+NO_DOCUMENT = ""
+NO_EMPLOYEE = "-"
+KEY_PREFIX = "verify:latest:"
+GENERATION_PREFIX = "verify:gen:"
+# How long forget() tombstones are kept; far longer than any load takes.
+FORGET_WINDOW = 60
+_MISSING = object()
+
+
+class VerificationCache:
+    def __init__(self, maxsize: int = 100000, ttl: float = 300, backend: str | None = None,
+                 local_ttl: float = 5):
+        self.ttl = ttl
+        self.backend = backend
+        self.local = LRUCache(maxsize, ttl=min(ttl, local_ttl))
+        # casefolded empid -> generation of its latest forget().
+        self._forgotten = LRUCache(maxsize, ttl=FORGET_WINDOW)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.local_hits = self.shared_hits = self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.backend] if self.backend else None
+
+    def _count(self, local=0, shared=0, misses=0):
+        with self._lock:
+            self.local_hits += local
+            self.shared_hits += shared
+            self.misses += misses
+
+    def _get_local(self, empids):
+        """Return ({casefolded empid: value}, [empids not in the local tier])."""
+        found, missing = {}, []
+        for empid in dict.fromkeys(empids):
+            value = self.local.get(empid.casefold(), _MISSING)
+            if value is _MISSING:
+                missing.append(empid)
+            else:
+                found[empid.casefold()] = value
+        return found, missing
+
+    def _shared_keys(self, empids):
+        keys = [e.casefold() for e in empids]
+        return [KEY_PREFIX + k for k in keys] + [GENERATION_PREFIX + k for k in keys]
+
+    def _take_shared(self, missing, shared, found, generations, started):
+        """Move valid shared entries into found; return the empids still missing."""
+        still_missing = []
+        for empid in missing:
+            key = empid.casefold()
+            generation = shared.get(GENERATION_PREFIX + key, 0)
+            entry = shared.get(KEY_PREFIX + key)
+            if entry is not None and entry[0] == generation:
+                found[key] = entry[1]
+                self._fill_local(key, entry[1], started)
+            else:
+                still_missing.append(empid)
+                generations[key] = generation
+        return still_missing
+
+    def get_many(self, empids, load):
+        """Map each casefolded empid to its cached value, calling load() for misses.
+
+        load(empids) must return {casefolded empid: value} for every empid.
+        """
+        with self._lock:
+            started = self._generation
+        found, missing = self._get_local(empids)
+        local_hits = len(found)
+        generations = {}
+        if missing and self.shared is not None:
+            shared = self.shared.get_many(self._shared_keys(missing))
+            missing = self._take_shared(missing, shared, found, generations, started)
+        shared_hits = len(found) - local_hits
+        if missing:
+            loaded = load(missing)
+            self._fill(loaded, found, started)
+            if self.shared is not None:
+                self.shared.set_many(self._shared_entries(loaded, generations), self.ttl)
+        self._count(local=local_hits, shared=shared_hits, misses=len(missing))
+        return found
+
+    async def aget_many(self, empids, aload):
+        """get_many() for async callers: aload() is awaited, the shared tier used async."""
+        with self._lock:
+            started = self._generation
+        found, missing = self._get_local(empids)
+        local_hits = len(found)
+        generations = {}
+        if missing and self.shared is not None:
+            shared = await self.shared.aget_many(self._shared_keys(missing))
+            missing = self._take_shared(missing, shared, found, generations, started)
+        shared_hits = len(found) - local_hits
+        if missing:
+            loaded = await aload(missing)
+            self._fill(loaded, found, started)
+            if self.shared is not None:
+                await self.shared.aset_many(self._shared_entries(loaded, generations), self.ttl)
+        self._count(local=local_hits, shared=shared_hits, misses=len(missing))
+        return found
+
+    def _fill(self, loaded, found, started):
+        for key, value in loaded.items():
+            self._fill_local(key, value, started)
+        found.update(loaded)
+
+    def _shared_entries(self, loaded, generations):
+        # Tagged with the generation read before loading: a forget() since then
+        # has moved the generation on, so these entries are already stale.
+        return {KEY_PREFIX + k: (generations.get(k, 0), v) for k, v in loaded.items()}
+
+    def _fill_local(self, key, value, started):
+        with self._lock:
+            if self._forgotten.get(key, -1) > started:
+                return  # forgotten while we were loading
+            self.local.set(key, value)
+
+    def forget(self, *empids):
+        keys = [e.casefold() for e in empids]
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._forgotten.set(key, self._generation)
+                self.local.delete(key)
+        if self.shared is not None and keys:
+            for key in keys:
+                self._bump_generation(GENERATION_PREFIX + key)
+            self.shared.delete_many([KEY_PREFIX + k for k in keys])
+
+    def _bump_generation(self, cache_key):
+        try:
+            self.shared.incr(cache_key)
+        except ValueError:  # first forget for this employee
+            if not self.shared.add(cache_key, 1, None):
+                self.shared.incr(cache_key)
+
+    def clear(self):
+        self.local.clear()
+        self._forgotten.clear()
+        with self._lock:
+            self.local_hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                "localHits": self.local_hits,
+                "sharedHits": self.shared_hits,
+                "misses": self.misses,
+                "hitRate": round((lookups - self.misses) / lookups, 4) if lookups else None,
+                "localEntries": len(self.local),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_verification_cache() -> VerificationCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = VerificationCache(
+                    maxsize=getattr(settings, "VERIFY_CACHE_SIZE", 100000),
+                    ttl=getattr(settings, "VERIFY_CACHE_TTL", 300),
+                    backend=getattr(settings, "VERIFY_CACHE_BACKEND", None),
+                    local_ttl=getattr(settings, "VERIFY_CACHE_LOCAL_TTL", 5),
+                )
+    return _cache
+
+
+def forget_employees(*empids):
+    get_verification_cache().forget(*empids)
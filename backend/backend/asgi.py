@@ -3,6 +3,22 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Deploying with uvicorn (``pip install uvicorn``)::
+
+    uvicorn backend.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+Database connections are not persistent under ASGI (CONN_MAX_AGE is 0 in
+settings.py): pool them in front of MySQL, e.g. with ProxySQL, rather than
+in Django.
+
+Every endpoint keeps working under ASGI. The async variants mounted at
+/api/async/ (me, profile, documents, verify; see api/async_api.py) use the
+async ORM, so one worker keeps serving other requests while a query or an
+upload is in flight. Compare against the WSGI baseline with, e.g.::
+
+    gunicorn backend.wsgi:application --workers 4
+    python manage.py loadtest_http --base-url http://127.0.0.1:8000/api/async
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
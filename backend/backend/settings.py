@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',  # first, so it times the whole stack
+    'api.db_router.PrimaryPinningMiddleware',
     "corsheaders.middleware.CorsMiddleware",  
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -98,9 +100,30 @@ DATABASES = {
         'PASSWORD': 'YOUR_PASSWORD',
         'HOST': 'localhost',  
         'PORT': '3306',
-    }
+        # One connection per request. We deploy under ASGI (backend/asgi.py),
+        # where persistent connections belong to the async context that opened
+        # them, so they are never reused and pile up until MySQL runs out of
+        # max_connections. Pool in front of MySQL instead (ProxySQL or MySQL
+        # Router). A WSGI-only deployment (gunicorn) may set 60 here, with
+        # 'CONN_HEALTH_CHECKS': True.
+        'CONN_MAX_AGE': 0,
+    },
+    # Read replicas are configured like 'default' and listed in DATABASE_REPLICAS:
+    # 'replica': {
+    #     ...,
+    #     'CONN_MAX_AGE': 0,
+    #     'TEST': {'MIRROR': 'default'},
+    # },
+    # backend.test_settings adds such a mirrored 'replica' for the test suite:
+    #     python manage.py test --settings=backend.test_settings
 }
 
+# Views marked @replica_reads read from these aliases (see api.db_router);
+# a client that just wrote reads from the primary for REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['api.db_router.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+
 
 
 # Password validation
@@ -149,3 +172,112 @@ DEBUG = True
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Document bytes are kept in a content-addressed store, not in MySQL. Keep
+# the root outside MEDIA_ROOT: media is served without any ownership check,
+# so documents may only leave through the download view (or X-Sendfile).
+BLOB_STORE_BACKEND = "api.blob_store.FileSystemBlobStore"
+BLOB_STORE_OPTIONS = {"root": BASE_DIR / "blobs"}
+
+# Uploads larger than this are rejected while streaming, before they are stored.
+# For resumable uploads it caps the sum of a session's parts.
+DOCUMENT_MAX_UPLOAD_BYTES = 256 * 1024 * 1024
+
+# Seconds a resumable upload session stays open; prune_blobs deletes expired
+# sessions and any staged parts left behind.
+UPLOAD_SESSION_TTL = 24 * 3600
+
+# Renderer for both Ninja APIs; the default encodes with orjson when it is
+# installed and falls back to json.dumps (see api.renderers).
+API_JSON_RENDERER = "api.renderers.FastJSONRenderer"
+
+# Token-bucket rate limits (see api.throttling): per scope, "ip" and
+# "account" (the email or employee ID in the body) rates as "N/period",
+# allowing bursts of N. Omit a scope or kind to leave it unlimited. Set
+# API_THROTTLE_BACKEND to a CACHES alias to share buckets between workers.
+API_THROTTLE_RATES = {
+    "login": {"ip": "30/min", "account": "10/min"},
+    "register": {"ip": "10/min", "account": "5/min"},
+    "verify": {"ip": "300/min", "account": "120/min"},
+    # Counted in items, not requests; keep the burst at least VERIFY_BATCH_MAX_ITEMS.
+    "verify_batch": {"ip": "20000/hour"},
+}
+API_THROTTLE_BACKEND = None
+
+# Downloads: None streams the bytes from Django. "x-accel-redirect" (nginx)
+# or "x-sendfile" (Apache/lighttpd) hands the file to the front proxy; for
+# nginx, DOCUMENT_SENDFILE_PREFIX is an `internal` location aliased to the
+# blob store root (see api.downloads).
+DOCUMENT_SENDFILE = None
+DOCUMENT_SENDFILE_PREFIX = "/protected-blobs/"
+
+# /verify/batch/ limits: items per request and items resolved per query.
+VERIFY_BATCH_MAX_ITEMS = 10000
+VERIFY_BATCH_CHUNK_SIZE = 1000
+
+# Verification cache of each employee's latest document hash (see
+# api.verify_cache): LRU entries per process, which live at most
+# VERIFY_CACHE_LOCAL_TTL seconds because uploads on one worker cannot evict
+# them on another. With several workers, set VERIFY_CACHE_BACKEND to a
+# CACHES alias: entries there are invalidated for everyone at once and live
+# VERIFY_CACHE_TTL seconds.
+VERIFY_CACHE_SIZE = 100000
+VERIFY_CACHE_TTL = 300
+VERIFY_CACHE_BACKEND = None
+VERIFY_CACHE_LOCAL_TTL = 5
+
+# Per-route metrics served at /metrics (see api.metrics). Requests slower
+# than METRICS_SLOW_REQUEST_SECONDS are logged with their SQL (None turns
+# the slow log off); set METRICS_TOKEN to require "Authorization: Bearer".
+METRICS_SLOW_REQUEST_SECONDS = 1.0
+METRICS_TOKEN = None
+
+# Per-process auth caches: verified JWT claims (until the token's exp) and
+# employees (for JWT_EMPLOYEE_CACHE_TTL seconds; 0 disables).
+JWT_DECODE_CACHE_SIZE = 10000
+JWT_EMPLOYEE_CACHE_SIZE = 10000
+JWT_EMPLOYEE_CACHE_TTL = 30
+
+# Per-process cache of the profile and its version served by /me/ and
+# /profile/ (see api.profiles). Writes forget the entry in their own
+# process once they commit; other workers serve theirs for at most
+# PROFILE_CACHE_TTL seconds (0 disables), and clients pinned to the primary
+# after a write (REPLICA_PIN_SECONDS) bypass it.
+PROFILE_CACHE_SIZE = 10000
+PROFILE_CACHE_TTL = 5
+
+# Password KDF (see api.passwords). Hashing runs on a bounded pool of
+# `workers` threads ("executor": "process" for a process pool); callers get
+# a 503 once `max_pending` more are queued for longer than `timeout` seconds.
+PASSWORD_KDF = {
+    "algorithm": "scrypt",
+    "n": 2 ** 14,
+    "r": 8,
+    "p": 1,
+    "workers": 4,
+    "max_pending": 32,
+    "timeout": 5.0,
+}
+
+# Pool for bulk imports (same KDF, separate workers and queue) so imports
+# never take the slots logins wait on. About 17 scrypt hashes a second per
+# worker; size workers to the cores left over after the login pool.
+PASSWORD_KDF_IMPORT = {
+    "workers": 2,
+    "max_pending": 8,
+    "timeout": 60.0,
+}
+
+# Employee IDs are EMPID_PREFIX plus a zero-padded sequence number (10 chars
+# total); each process reserves EMPID_BLOCK_SIZE numbers at a time.
+EMPID_PREFIX = "E"
+EMPID_BLOCK_SIZE = 100
+
+# Rows per bulk_create transaction for /employees/import/ and import_employees.
+EMPLOYEE_IMPORT_BATCH_SIZE = 1000
+# /employees/import/ spools files here; run_employee_imports (cron) imports them.
+EMPLOYEE_IMPORT_ROOT = BASE_DIR / "imports"
+# Seconds an /employees/{id}/invite/ token stays redeemable at /auth/set-password/.
+EMPLOYEE_INVITE_MAX_AGE = 7 * 86400
+# Employees per keyset page for /employees/export/ and export_employees.
+EMPLOYEE_EXPORT_PAGE_SIZE = 2000
@@ -0,0 +1,13 @@
+"""Settings for the test suite::
+
+    python manage.py test --settings=backend.test_settings
+
+Adds a 'replica' alias that mirrors 'default' under test, so the replica
+routing tests run against the test database instead of being skipped.
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    **DATABASES,
+    'replica': {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}},
+}
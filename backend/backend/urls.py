@@ -18,12 +18,16 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 from api.api import api
+from api.async_api import async_api
+from api.metrics import metrics_view
 from django.conf import settings
 from django.conf.urls.static import static
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view),  # Prometheus scrape target
+    path('api/async/', async_api.urls),  # async variants, see backend/asgi.py
     path('api/', api.urls),  # This includes your /hello endpoint from the NinjaAPI instance
 ]  + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 